@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds several configurations of the package concurrently on the local machine.
+
+    python build_matrix.py variants.json [--jobs=32] [--parallel=4] [--test]
+    python build_matrix.py --variant "build_type=Release shared=True" --variant "build_type=Debug"
+
+variants.json is a list of variants, e.g.
+    [{"name": "static-release", "settings": {"build_type": "Release"}, "options": {"shared": false}},
+     {"name": "shared-release", "settings": {"build_type": "Release"}, "options": {"shared": true}}]
+Options without a package prefix are options of opencv.
+
+The recipe is exported once. The source archives are kept in OPENCV_SOURCE_CACHE. The opencv sources are extracted
+into the conan cache by the first variant and reused by the others. Contrib is extracted again by each variant
+building contrib modules, in its own build folder. Variants run concurrently, sharing the --jobs budget, and use the
+same compiler cache. Variants whose package is already in the local cache are skipped, variants with the same package
+id as another one are only built once.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_setting_roots = ["os", "os_build", "compiler", "build_type", "arch", "arch_build", "cppstd"]
+
+
+class Variant(object):
+    def __init__(self, name, settings, options):
+        self.name = name
+        self.settings = settings
+        self.options = options
+        self.package_id = None
+        self.status = "pending"
+        self.jobs = None
+        self.duration = None
+        self.log_file = None
+
+    @classmethod
+    def parse(cls, text):
+        # "build_type=Release shared=True opencv:lto=thin"
+        settings, options = {}, {}
+        for item in text.split():
+            name, value = item.split('=', 1)
+            if name.split('.')[0] in _setting_roots:
+                settings[name] = value
+            else:
+                options[name] = value
+        return cls(text.replace(' ', ',').replace(':', '_'), settings, options)
+
+    def arguments(self, name):
+        arguments = []
+        for setting, value in sorted(self.settings.items()):
+            arguments.extend(['-s', '%s=%s' % (setting, value)])
+        for option, value in sorted(self.options.items()):
+            if ':' not in option:
+                option = '%s:%s' % (name, option)
+            arguments.extend(['-o', '%s=%s' % (option, value)])
+        return arguments
+
+
+class BuildMatrix(object):
+    def __init__(self, variants, jobs, parallel, profile, reference, work_folder, test):
+        self.variants = variants
+        self.jobs = jobs
+        self.parallel = max(1, min(parallel, len(variants)))
+        self.profile = profile
+        self.reference = reference
+        self.name = reference.split('/')[0]
+        self.work_folder = work_folder
+        self.test = test
+        self._lock = threading.Lock()
+        self._unfinished = len(variants)
+
+    def _conan(self, arguments, env=None, log=None):
+        command = ['conan'] + arguments
+        if self.profile:
+            if arguments[0] in ['install', 'info', 'test']:
+                command.extend(['-pr', self.profile])
+        if log:
+            return subprocess.call(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+        return subprocess.check_output(command, env=env)
+
+    def _environment(self, jobs):
+        env = dict(os.environ)
+        # the CMake helper of conan builds with CONAN_CPU_COUNT jobs
+        env['CONAN_CPU_COUNT'] = str(jobs)
+        # source archives shared by all the variants
+        env.setdefault('OPENCV_SOURCE_CACHE', os.path.join(self.work_folder, 'sources'))
+        # every variant builds in its own folder of the conan cache, compiler caches have to ignore the folder
+        env.setdefault('CCACHE_BASEDIR', self._storage_path())
+        env.setdefault('CCACHE_DIR', os.path.join(self.work_folder, 'ccache'))
+        env.setdefault('SCCACHE_DIR', os.path.join(self.work_folder, 'sccache'))
+        return env
+
+    def _storage_path(self):
+        storage = self._conan(['config', 'get', 'storage.path']).decode().strip()
+        if not os.path.isabs(os.path.expanduser(storage)):
+            # relative to the conan home, e.g. "./data"
+            storage = os.path.join(self._conan(['config', 'home']).decode().strip(), storage)
+        return os.path.normpath(os.path.expanduser(storage))
+
+    def _package_id(self, variant):
+        info_file = os.path.join(tempfile.mkdtemp(), 'info.json')
+        self._conan(['info', self.reference, '--json', info_file] + variant.arguments(self.name))
+        with open(info_file) as f:
+            for node in json.load(f):
+                if node.get('reference') == self.reference:
+                    return node.get('id')
+        return None
+
+    def _existing_package_ids(self):
+        search_file = os.path.join(tempfile.mkdtemp(), 'search.json')
+        try:
+            self._conan(['search', self.reference, '--json', search_file])
+        except subprocess.CalledProcessError:
+            return set()
+        with open(search_file) as f:
+            results = json.load(f).get('results', [])
+        return set(package['id'] for result in results for item in result.get('items', [])
+                   for package in item.get('packages', []))
+
+    def _build(self, variant):
+        with self._lock:
+            # the budget is split between the variants which are still to be built
+            variant.jobs = max(1, self.jobs // min(self.parallel, self._unfinished))
+            variant.status = "building"
+        variant.log_file = os.path.join(self.work_folder, 'logs', '%s.log' % variant.name)
+        print("[%s] started, %d jobs" % (variant.name, variant.jobs))
+        start = time.time()
+        try:
+            env = self._environment(variant.jobs)
+            with open(variant.log_file, 'w') as log:
+                result = self._conan(['install', self.reference, '--build=missing',
+                                      '-if', os.path.join(self.work_folder, 'install', variant.name)] +
+                                     variant.arguments(self.name), env=env, log=log)
+                if result == 0 and self.test:
+                    result = self._conan(['test', 'test_package', self.reference] + variant.arguments(self.name),
+                                         env=env, log=log)
+        except Exception as e:
+            # e.g. conan config failing, the other variants are still built and reported
+            print("[%s] %s" % (variant.name, e))
+            result = None
+        variant.duration = time.time() - start
+        variant.status = "built" if result == 0 else "failed"
+        with self._lock:
+            self._unfinished -= 1
+        print("[%s] %s in %.0f s, log: %s" % (variant.name, variant.status, variant.duration, variant.log_file))
+
+    def run(self):
+        for folder in ['logs', 'install', 'sources']:
+            if not os.path.isdir(os.path.join(self.work_folder, folder)):
+                os.makedirs(os.path.join(self.work_folder, folder))
+        user_channel = self.reference.split('@')[1]
+        self._conan(['export', '.', user_channel])
+
+        existing = self._existing_package_ids()
+        pending = []
+        for variant in self.variants:
+            try:
+                variant.package_id = self._package_id(variant)
+            except subprocess.CalledProcessError as e:
+                # e.g. an invalid configuration, the other variants are still built
+                variant.status = "failed"
+                print("[%s] conan info failed: %s" % (variant.name, e))
+                continue
+            if variant.package_id in existing:
+                variant.status = "skipped"
+                print("[%s] package %s is in the cache, skipped" % (variant.name, variant.package_id))
+                continue
+            builder = next((other for other in pending
+                            if variant.package_id and other.package_id == variant.package_id), None)
+            if builder:
+                # e.g. variants differing only by options removed from the package id, the package is built once
+                variant.status = "duplicate"
+                print("[%s] package %s is built by %s" % (variant.name, variant.package_id, builder.name))
+            else:
+                pending.append(variant)
+        self._unfinished = len(pending)
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            list(executor.map(self._build, pending))
+        self.report(time.time() - start)
+        return all(variant.status != "failed" for variant in self.variants)
+
+    def report(self, elapsed):
+        print("")
+        print("%-40s %-42s %-9s %6s %10s" % ("variant", "package_id", "status", "jobs", "duration"))
+        for variant in self.variants:
+            print("%-40s %-42s %-9s %6s %10s" % (variant.name, variant.package_id, variant.status, variant.jobs or '',
+                                                 '%.0f s' % variant.duration if variant.duration else ''))
+        print("total: %.0f s" % elapsed)
+        summary = {"jobs": self.jobs,
+                   "parallel": self.parallel,
+                   "total_s": round(elapsed, 1),
+                   "variants": [{"name": variant.name,
+                                 "settings": variant.settings,
+                                 "options": variant.options,
+                                 "package_id": variant.package_id,
+                                 "status": variant.status,
+                                 "jobs": variant.jobs,
+                                 "duration_s": round(variant.duration, 1) if variant.duration else None,
+                                 "log": variant.log_file} for variant in self.variants]}
+        with open(os.path.join(self.work_folder, 'build_matrix.json'), 'w') as f:
+            json.dump(summary, f, indent=4, sort_keys=True)
+
+
+def _reference():
+    inspect_file = os.path.join(tempfile.mkdtemp(), 'inspect.json')
+    subprocess.check_output(['conan', 'inspect', '.', '-a', 'name', '-a', 'version', '--json', inspect_file])
+    with open(inspect_file) as f:
+        attributes = json.load(f)
+    return '%s/%s@%s/%s' % (attributes['name'], attributes['version'],
+                            os.environ.get('CONAN_USERNAME', 'conan'), os.environ.get('CONAN_CHANNEL', 'testing'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds several configurations of the package concurrently")
+    parser.add_argument('variants_file', nargs='?', help="JSON list of variants")
+    parser.add_argument('--variant', action='append', default=[],
+                        help="settings and options of a variant, e.g. \"build_type=Debug shared=True\"")
+    parser.add_argument('--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help="total number of compiler jobs, shared by the variants built at the same time")
+    parser.add_argument('--parallel', type=int, default=None,
+                        help="number of variants built at the same time, by default one per 8 jobs")
+    parser.add_argument('--profile', help="conan profile used by all the variants")
+    parser.add_argument('--work-folder', default='build_matrix',
+                        help="logs, report, source and compiler caches")
+    parser.add_argument('--test', action='store_true', help="run test_package for each variant built")
+    args = parser.parse_args()
+
+    variants = [Variant.parse(text) for text in args.variant]
+    if args.variants_file:
+        with open(args.variants_file) as f:
+            variants.extend(Variant(entry['name'], entry.get('settings', {}), entry.get('options', {}))
+                            for entry in json.load(f))
+    if not variants:
+        parser.error("no variant to build")
+    parallel = args.parallel or max(1, args.jobs // 8)
+    matrix = BuildMatrix(variants, args.jobs, parallel, args.profile, _reference(),
+                         os.path.abspath(args.work_folder), args.test)
+    return 0 if matrix.run() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+# FFmpeg from conan, found by OpenCV through OPENCV_FFMPEG_USE_FIND_PACKAGE=FFMPEG
+# the recipe passes the ffmpeg package and its own dependencies (static FFmpeg libraries need them)
+
+if(FFMPEG_CONAN_LIBRARIES)
+    set(FFMPEG_FOUND TRUE)
+    set(FFMPEG_INCLUDE_DIRS ${FFMPEG_CONAN_INCLUDE_DIRS})
+    set(FFMPEG_LIBRARY_DIRS ${FFMPEG_CONAN_LIBRARY_DIRS})
+    set(FFMPEG_LIBRARIES ${FFMPEG_CONAN_LIBRARIES})
+else()
+    set(FFMPEG_FOUND FALSE)
+endif()
@@ -2,8 +2,16 @@
 # -*- coding: utf-8 -*-
 from conans import ConanFile, CMake, tools
 from conans.model.version import Version
-from conans.errors import ConanInvalidConfiguration
+from conans.errors import ConanInvalidConfiguration, ConanException
 import os
+import re
+import glob
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+import json
+import xml.etree.ElementTree as ElementTree
 
 
 class OpenCVConan(ConanFile):
@@ -37,7 +45,29 @@ class OpenCVConan(ConanFile):
                "eigen": [True, False],
                "glog": [True, False],
                "gflags": [True, False],
-               "gstreamer": [True, False]}
+               "gstreamer": [True, False],
+               "parallel_framework": [None, "tbb", "openmp", "pthreads", "gcd", "concurrency"],
+               "cpu_baseline": ["default", "SSE", "SSE2", "SSE3", "SSSE3", "SSE4_1", "POPCNT", "SSE4_2",
+                                "AVX", "FP16", "AVX2", "AVX512_SKX", "NEON", "VSX"],
+               "cpu_dispatch": "ANY",
+               "modules": "ANY",
+               "ipp": [True, False],
+               "perf_tests": [True, False],
+               "compiler_launcher": [None, "auto", "ccache", "sccache"],
+               "ninja": [True, False],
+               "lto": [None, "thin", "full"],
+               "pgo": [True, False],
+               "ffmpeg": [True, False],
+               "opencl": [True, False],
+               "lapack": [True, False],
+               "minimize_size": [True, False],
+               "debug_info": ["keep", "strip", "split"],
+               "data": "ANY",
+               "profiling": [True, False],
+               "threads": "ANY",
+               "thread_pool_wait": [None, "active", "passive"],
+               "memalign": [None, True, False],
+               "opencl_buffer_pool_limit": "ANY"}
     default_options = {"shared": False,
                        "fPIC": True,
                        "contrib": False,
@@ -59,14 +89,131 @@ class OpenCVConan(ConanFile):
                        "eigen": True,
                        'glog': True,
                        "gflags": True,
-                       "gstreamer": True}
-    exports_sources = ["CMakeLists.txt", "patches/*.patch"]
+                       "gstreamer": True,
+                       "parallel_framework": "pthreads",
+                       "cpu_baseline": "default",
+                       "cpu_dispatch": "default",
+                       "modules": "all",
+                       "ipp": False,
+                       "perf_tests": False,
+                       "compiler_launcher": "auto",
+                       "ninja": False,
+                       "lto": None,
+                       "pgo": False,
+                       "ffmpeg": False,
+                       "opencl": True,
+                       "lapack": False,
+                       "minimize_size": False,
+                       "debug_info": "keep",
+                       "data": "all",
+                       "profiling": False,
+                       "threads": "default",
+                       "thread_pool_wait": None,
+                       "memalign": None,
+                       "opencl_buffer_pool_limit": "default"}
+    exports_sources = ["CMakeLists.txt", "cmake/*.cmake", "patches/*.patch", "pgo/CMakeLists.txt",
+                       "test_package/lena.cpp", "test_package/benchmark_utils.hpp", "test_package/lena.jpg"]
     exports = "LICENSE"
     generators = "cmake"
     description = "OpenCV is an open source computer vision and machine learning software library."
     short_paths = True
     _source_subfolder = "source_subfolder"
     _build_subfolder = "build_subfolder"
+    _cmake = None
+    _pgo_phase = "use"
+    _pgo_profile_folder = "pgo_profiles"
+    _pgo_install_folder = "pgo_install"
+    _report = None
+    _report_file = "build_report.json"
+    _x86_cpu_features = ["SSE", "SSE2", "SSE3", "SSSE3", "SSE4_1", "POPCNT", "SSE4_2",
+                         "AVX", "FP16", "AVX2", "AVX512_SKX"]
+    _cpu_features_file = "cpu_features.json"
+    _perf_modules = ["core", "imgproc", "objdetect", "dnn"]
+    _perf_results_folder = "perf_results"
+    # data directories installed by OpenCV, under share/opencv4 (etc on Windows)
+    _data_folders = ["haarcascades", "lbpcascades"]
+    # OpenCV modules and the modules they link against (required and optional ones),
+    # core and contrib modules first, then CUDA ones
+    _module_dependencies = {
+        "core": [],
+        "flann": ["core"],
+        "imgproc": ["core"],
+        "ml": ["core"],
+        "photo": ["imgproc"],
+        "dnn": ["core", "imgproc"],
+        "features2d": ["imgproc", "flann"],
+        "imgcodecs": ["imgproc"],
+        "videoio": ["imgproc", "imgcodecs"],
+        "highgui": ["imgproc", "imgcodecs", "videoio"],
+        "calib3d": ["imgproc", "features2d", "flann"],
+        "objdetect": ["core", "imgproc", "calib3d"],
+        "video": ["imgproc", "calib3d"],
+        "stitching": ["imgproc", "features2d", "calib3d", "flann"],
+        "gapi": ["imgproc"],
+        "aruco": ["core", "imgproc", "calib3d"],
+        "bgsegm": ["core", "imgproc", "video"],
+        "bioinspired": ["core"],
+        "ccalib": ["core", "imgproc", "calib3d", "features2d", "highgui"],
+        "datasets": ["core", "imgcodecs", "ml", "flann"],
+        "dpm": ["core", "imgproc", "objdetect"],
+        "face": ["core", "imgproc", "objdetect", "calib3d", "photo"],
+        "freetype": ["core", "imgproc"],
+        "fuzzy": ["imgproc"],
+        "hfs": ["core", "imgproc"],
+        "img_hash": ["core", "imgproc"],
+        "line_descriptor": ["imgproc", "features2d"],
+        "optflow": ["core", "imgproc", "video", "ximgproc"],
+        "phase_unwrapping": ["core", "imgproc"],
+        "plot": ["core", "imgproc"],
+        "reg": ["imgproc"],
+        "rgbd": ["core", "calib3d", "imgproc"],
+        "saliency": ["imgproc", "features2d"],
+        "shape": ["core", "imgproc", "calib3d"],
+        "stereo": ["core", "imgproc", "features2d"],
+        "structured_light": ["core", "imgproc", "calib3d", "phase_unwrapping"],
+        "superres": ["imgproc", "video", "optflow", "videoio"],
+        "surface_matching": ["core", "flann"],
+        "tracking": ["core", "imgproc", "video", "plot", "dnn", "datasets"],
+        "videostab": ["imgproc", "features2d", "video", "photo", "calib3d", "videoio"],
+        "xfeatures2d": ["core", "imgproc", "features2d", "calib3d", "shape", "ml"],
+        "ximgproc": ["core", "imgproc", "calib3d", "imgcodecs", "video"],
+        "xobjdetect": ["core", "imgproc", "objdetect", "imgcodecs"],
+        "xphoto": ["core", "imgproc", "photo"],
+        "text": ["core", "ml", "imgproc", "features2d", "dnn"],
+        "dnn_objdetect": ["core", "imgproc", "dnn"],
+        "sfm": ["core", "calib3d", "features2d", "xfeatures2d"],
+        "cudev": [],
+        "cudaarithm": ["core", "cudev"],
+        "cudabgsegm": ["video", "cudev"],
+        "cudacodec": ["core", "videoio", "cudev"],
+        "cudafeatures2d": ["features2d", "cudafilters", "cudawarping"],
+        "cudafilters": ["imgproc", "cudaarithm"],
+        "cudaimgproc": ["imgproc", "cudev"],
+        "cudalegacy": ["core", "video", "cudev"],
+        "cudaobjdetect": ["core", "objdetect", "cudaarithm", "cudawarping"],
+        "cudaoptflow": ["video", "optflow", "cudaarithm", "cudawarping", "cudaimgproc", "cudalegacy"],
+        "cudastereo": ["calib3d", "cudev"],
+        "cudawarping": ["core", "imgproc", "cudev"]}
+    # OpenCV module consuming each conan requirement, a requirement is only used when its module is built
+    _requirement_modules = {"zlib": "core",
+                            "eigen": "core",
+                            "tbb": "core",
+                            "openblas": "core",
+                            "libjpeg": "imgcodecs",
+                            "libjpeg-turbo": "imgcodecs",
+                            "libtiff": "imgcodecs",
+                            "libwebp": "imgcodecs",
+                            "libpng": "imgcodecs",
+                            "jasper": "imgcodecs",
+                            "openexr": "imgcodecs",
+                            "protobuf": "dnn",
+                            "freetype": "freetype",
+                            "harfbuzz": "freetype",
+                            "glog": "sfm",
+                            "gflags": "sfm",
+                            "ffmpeg": "videoio"}
+    _main_modules = ["core", "flann", "imgproc", "ml", "photo", "dnn", "features2d", "imgcodecs", "videoio",
+                     "highgui", "calib3d", "objdetect", "video", "stitching", "gapi"]
 
     def configure(self):
         compiler_version = Version(self.settings.compiler.version.value)
@@ -76,25 +223,306 @@ class OpenCVConan(ConanFile):
         if self.options.cuda and not self.options.contrib:
             raise ConanInvalidConfiguration(
                 "opencv:cuda requires opencv:contrib")
+        if self.options.lapack:
+            # OpenCV needs the LAPACKE interface, not only CBLAS
+            self.options["openblas"].build_lapack = True
+        # parallel.cpp enables GCD on Apple platforms and Concurrency with MSVC by itself, both take precedence
+        # over pthreads, so neither pthreads nor no backend at all can be honoured there
+        if self.options.parallel_framework in ["pthreads", "None"] and self.settings.os in ["Macos", "iOS"]:
+            raise ConanInvalidConfiguration(
+                "opencv:parallel_framework=%s is not supported on Apple platforms, OpenCV always uses gcd there"
+                % self.options.parallel_framework)
+        if self.options.parallel_framework in ["pthreads", "None"] and self.settings.compiler == "Visual Studio":
+            raise ConanInvalidConfiguration(
+                "opencv:parallel_framework=%s is not supported with Visual Studio, OpenCV always uses concurrency "
+                "there" % self.options.parallel_framework)
+        if self.options.parallel_framework == "gcd" and self.settings.os not in ["Macos", "iOS"]:
+            raise ConanInvalidConfiguration(
+                "opencv:parallel_framework=gcd is only available on Apple platforms")
+        if self.options.parallel_framework == "concurrency" and self.settings.compiler != "Visual Studio":
+            raise ConanInvalidConfiguration(
+                "opencv:parallel_framework=concurrency requires Visual Studio")
+        if self.options.parallel_framework == "openmp" and self.settings.compiler == "apple-clang":
+            raise ConanInvalidConfiguration(
+                "opencv:parallel_framework=openmp is not supported by apple-clang")
+        is_x86 = str(self.settings.arch) in ["x86", "x86_64"]
+        for feature in [str(self.options.cpu_baseline)] + self._cpu_dispatch_list:
+            if feature in self._x86_cpu_features and not is_x86:
+                raise ConanInvalidConfiguration(
+                    "CPU feature %s is not available on %s" % (feature, self.settings.arch))
+            if feature in ["NEON", "VSX"] and is_x86:
+                raise ConanInvalidConfiguration(
+                    "CPU feature %s is not available on %s" % (feature, self.settings.arch))
+        if self.options.lto == "thin" and self.settings.compiler not in ["clang", "apple-clang"]:
+            raise ConanInvalidConfiguration("opencv:lto=thin requires clang")
+        if self.options.lto == "full" and self.settings.compiler not in ["gcc", "clang", "apple-clang",
+                                                                         "Visual Studio"]:
+            raise ConanInvalidConfiguration("opencv:lto=full is not supported by %s" % self.settings.compiler)
+        if self.options.pgo and (self.settings.compiler not in ["gcc", "clang", "apple-clang"] or
+                                 self.settings.os == "Windows"):
+            raise ConanInvalidConfiguration("opencv:pgo requires gcc or clang on a non-Windows OS")
+        if self.options.profiling and self.options.debug_info == "strip":
+            raise ConanInvalidConfiguration(
+                "opencv:profiling requires the debug info, opencv:debug_info=strip removes it")
+        for option in ["threads", "opencl_buffer_pool_limit"]:
+            value = str(self.options.get_safe(option))
+            if value != "default" and not value.isdigit():
+                raise ConanInvalidConfiguration("opencv:%s must be a number or default" % option)
+        if self.options.thread_pool_wait and self.options.parallel_framework not in ["pthreads", "openmp"]:
+            raise ConanInvalidConfiguration(
+                "opencv:thread_pool_wait requires opencv:parallel_framework=pthreads or openmp")
+        for name in self._data_list:
+            if name not in self._data_folders:
+                raise ConanInvalidConfiguration("unknown OpenCV data directory %s" % name)
+        available_modules = self._available_modules
+        for name in self._requested_modules:
+            if name not in self._module_dependencies:
+                raise ConanInvalidConfiguration("unknown OpenCV module %s" % name)
+            if name not in available_modules:
+                raise ConanInvalidConfiguration(
+                    "OpenCV module %s is not available with the current options" % name)
+        if self.options.pgo and not os.environ.get('OPENCV_PGO_TRAINING'):
+            # the default training workload is the detection pipeline of test_package/lena.cpp
+            missing = [name for name in ["objdetect", "imgcodecs"] if name not in self._opencv_modules]
+            if missing:
+                raise ConanInvalidConfiguration(
+                    "opencv:pgo trains with the lena detection pipeline which needs the %s module(s), "
+                    "set OPENCV_PGO_TRAINING to a workload of your own" % ', '.join(missing))
+
+    @property
+    def _cpu_dispatch_list(self):
+        # cpu_dispatch is a comma-separated list, e.g. "SSE4_2,AVX,AVX2"
+        if str(self.options.cpu_dispatch) in ["default", "NONE"]:
+            return []
+        return [feature.strip() for feature in str(self.options.cpu_dispatch).split(',') if feature.strip()]
+
+    @property
+    def _runtime_defaults(self):
+        # environment variables read by OpenCV at run time, for the options which aren't left to the defaults
+        env = {}
+        if self.options.threads != "default":
+            env['OPENCV_FOR_THREADS_NUM'] = str(self.options.threads)
+        if self.options.thread_pool_wait == "passive":
+            # workers and the main thread sleep right away instead of spinning for the next job
+            if self.options.parallel_framework == "pthreads":
+                env['OPENCV_THREAD_POOL_ACTIVE_WAIT_PAUSE_LIMIT'] = '0'
+                env['OPENCV_THREAD_POOL_ACTIVE_WAIT_WORKER'] = '0'
+                env['OPENCV_THREAD_POOL_ACTIVE_WAIT_MAIN'] = '0'
+            else:
+                env['OMP_WAIT_POLICY'] = 'PASSIVE'
+        elif self.options.thread_pool_wait == "active" and self.options.parallel_framework == "openmp":
+            env['OMP_WAIT_POLICY'] = 'ACTIVE'
+        if str(self.options.memalign) != "None":
+            env['OPENCV_ENABLE_MEMALIGN'] = '1' if self.options.memalign else '0'
+        if self.options.opencl and self.options.opencl_buffer_pool_limit != "default":
+            env['OPENCV_OPENCL_BUFFERPOOL_LIMIT'] = str(self.options.opencl_buffer_pool_limit)
+        return env
+
+    @property
+    def _data_list(self):
+        # data is "all", "none" or a comma-separated list, e.g. "haarcascades"
+        if self.options.data == "all":
+            return list(self._data_folders)
+        if self.options.data == "none":
+            return []
+        return [name.strip() for name in str(self.options.data).split(',') if name.strip()]
+
+    @property
+    def _available_modules(self):
+        # modules which can be built with the current options
+        modules = set(self._main_modules)
+        if not self.options.protobuf:
+            modules.discard("dnn")
+        if self.settings.os == 'Android':
+            # gapi depends on ade but ade disabled for Android
+            # https://github.com/opencv/opencv/blob/4.0.1/modules/gapi/cmake/DownloadADE.cmake#L2
+            modules.discard("gapi")
+        if self.options.contrib:
+            modules.update(name for name in self._module_dependencies
+                           if name not in self._main_modules and not name.startswith("cud"))
+            if not self.options.protobuf:
+                modules.discard("dnn_objdetect")
+            if not self.options.freetype or not self.options.harfbuzz:
+                modules.discard("freetype")
+            if not self.options.eigen or not self.options.glog or not self.options.gflags:
+                modules.discard("sfm")
+        if self.options.cuda:
+            modules.update(name for name in self._module_dependencies if name.startswith("cud"))
+        return modules
+
+    @property
+    def _requested_modules(self):
+        # modules is either "all" or a comma-separated list, e.g. "imgcodecs,objdetect"
+        if self.options.modules == "all":
+            return sorted(self._available_modules)
+        modules = [name.strip() for name in str(self.options.modules).split(',') if name.strip()]
+        if self.options.get_safe("perf_tests"):
+            # the ts module used by the perf tests needs highgui and its dependencies
+            modules.append("highgui")
+        return modules
+
+    @property
+    def _opencv_modules(self):
+        # requested modules with all their dependencies, each module is listed before the
+        # modules it depends on, so the list is usable as a static link order
+        available = self._available_modules
+        ordered = []
+
+        def visit(name):
+            if name in ordered or name not in available:
+                return
+            for dependency in self._module_dependencies[name]:
+                visit(dependency)
+            ordered.append(name)
+
+        # core is always built, everything else links against it
+        for name in ["core"] + self._requested_modules:
+            visit(name)
+        return list(reversed(ordered))
+
+    @property
+    def _report_folder(self):
+        # source() runs in the source folder, which is then copied into the build folder
+        build_folder = getattr(self, 'build_folder', None)
+        return build_folder if build_folder and os.path.isdir(build_folder) else os.getcwd()
+
+    def _load_report(self):
+        if self._report is None:
+            report_path = os.path.join(self._report_folder, self._report_file)
+            self._report = json.loads(tools.load(report_path)) if os.path.isfile(report_path) else {"phases": []}
+        return self._report
+
+    def _save_report(self, folder=None):
+        tools.save(os.path.join(folder or self._report_folder, self._report_file),
+                   json.dumps(self._load_report(), indent=4, sort_keys=True))
+
+    @contextmanager
+    def _timed(self, phase):
+        # wall time, and CPU time of the recipe and of the processes it waited for (compilers, ...)
+        report = self._load_report()
+        wall = time.time()
+        cpu = sum(os.times()[:4])
+        try:
+            yield
+        finally:
+            report["phases"].append({"phase": phase,
+                                     "wall_s": round(time.time() - wall, 3),
+                                     "cpu_s": round(sum(os.times()[:4]) - cpu, 3)})
+            self._save_report()
+
+    def _compiler_cache_stats(self):
+        # (hits, misses) counters of the compiler launcher, None if unknown
+        launcher = self._compiler_launcher
+        if not launcher:
+            return None
+        try:
+            if os.path.basename(launcher).startswith('sccache'):
+                stats = json.loads(subprocess.check_output([launcher, '--show-stats', '--stats-format=json'])
+                                   .decode())["stats"]
+                return (sum(stats["cache_hits"]["counts"].values()),
+                        sum(stats["cache_misses"]["counts"].values()))
+            output = subprocess.check_output([launcher, '--print-stats']).decode()
+            stats = dict(line.split('\t', 1) for line in output.splitlines() if '\t' in line)
+            return (int(stats.get('direct_cache_hit', 0)) + int(stats.get('preprocessed_cache_hit', 0)),
+                    int(stats.get('cache_miss', 0)))
+        except (OSError, ValueError, KeyError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def _file_url(folder):
+        return 'file:///%s/' % folder.replace('\\', '/').strip('/')
+
+    @property
+    def _mirror_url(self):
+        # OPENCV_SOURCE_MIRROR is either a local directory or an URL prefix, holding the files by their name
+        mirror = os.environ.get('OPENCV_SOURCE_MIRROR')
+        if not mirror:
+            return None
+        if os.path.isdir(mirror):
+            return self._file_url(mirror)
+        return mirror.rstrip('/') + '/'
+
+    def _get_archive(self, url, filename, sha256):
+        # archives are kept in OPENCV_SOURCE_CACHE by their sha256, and taken from the mirror if any
+        cache_folder = os.environ.get('OPENCV_SOURCE_CACHE')
+        archive = os.path.join(cache_folder, sha256, filename) if cache_folder else filename
+        if os.path.isfile(archive):
+            try:
+                tools.check_sha256(archive, sha256)
+                return archive
+            except ConanException:
+                try:
+                    os.remove(archive)
+                except OSError:
+                    pass
+        archive_folder = os.path.dirname(os.path.abspath(archive))
+        tools.mkdir(archive_folder)
+        # fetched under a temporary name and renamed once verified, so the builds sharing the cache
+        # concurrently (e.g. build_matrix.py) never see a partial archive
+        temporary = os.path.join(archive_folder, '%s.%d.part' % (filename, os.getpid()))
+        mirror = os.environ.get('OPENCV_SOURCE_MIRROR')
+        try:
+            if mirror and os.path.isdir(mirror):
+                shutil.copy(os.path.join(mirror, filename), temporary)
+            else:
+                tools.download(self._mirror_url + filename if mirror else url, temporary, overwrite=True)
+            tools.check_sha256(temporary, sha256)
+            try:
+                os.rename(temporary, archive)
+            except OSError:
+                # Windows doesn't replace an existing file: another build stored the archive meanwhile
+                if not os.path.isfile(archive):
+                    raise
+        finally:
+            if os.path.isfile(temporary):
+                os.remove(temporary)
+        return archive
+
+    def _extract(self, url, filename, sha256, folder):
+        archive = self._get_archive(url, filename, sha256)
+        tools.unzip(archive)
+        if not os.environ.get('OPENCV_SOURCE_CACHE'):
+            os.remove(archive)
+        os.rename(filename.replace('.tar.gz', ''), folder)
+
+    @property
+    def _contrib_required(self):
+        return self.options.contrib and any(name not in self._main_modules for name in self._opencv_modules)
 
     def source(self):
-        sha256 = "8f6e4ab393d81d72caae6e78bd0fd6956117ec9f006fba55fcdb88caf62989b7"
-        tools.get("{}/archive/{}.tar.gz".format(self.homepage, self.version), sha256=sha256)
-        os.rename('opencv-%s' % self.version, self._source_subfolder)
+        with self._timed("source"):
+            sha256 = "8f6e4ab393d81d72caae6e78bd0fd6956117ec9f006fba55fcdb88caf62989b7"
+            self._extract("{}/archive/{}.tar.gz".format(self.homepage, self.version),
+                          "opencv-%s.tar.gz" % self.version, sha256, self._source_subfolder)
 
-        sha256 = "e7d775cc0b87b04308823ca518b11b34cc12907a59af4ccdaf64419c1ba5e682"
-        tools.get("https://github.com/opencv/opencv_contrib/archive/{}.tar.gz".format(self.version), sha256=sha256)
-        os.rename('opencv_contrib-%s' % self.version, 'contrib')
+            for dir in ['libjasper', 'libjpeg-turbo', 'libjpeg', 'libpng', 'libtiff',
+                        'libwebp', 'openexr', 'protobuf', 'zlib']:
+                tools.rmdir(os.path.join(self._source_subfolder, '3rdparty', dir))
 
-        for dir in ['libjasper', 'libjpeg-turbo', 'libjpeg', 'libpng', 'libtiff',
-                    'libwebp', 'openexr', 'protobuf', 'zlib']:
-            tools.rmdir(os.path.join(self._source_subfolder, '3rdparty', dir))
+    def _source_contrib(self):
+        # contrib is only fetched by the configurations building contrib modules
+        if os.path.isdir('contrib'):
+            return
+        sha256 = "e7d775cc0b87b04308823ca518b11b34cc12907a59af4ccdaf64419c1ba5e682"
+        self._extract("https://github.com/opencv/opencv_contrib/archive/{}.tar.gz".format(self.version),
+                      "opencv_contrib-%s.tar.gz" % self.version, sha256, 'contrib')
 
     def config_options(self):
         if self.settings.os == 'Windows':
             del self.options.fPIC
         if self.settings.os != 'Linux':
             del self.options.gtk
+        # pick the backend OpenCV itself would prefer on the platform
+        if self.settings.os in ['Macos', 'iOS']:
+            self.options.parallel_framework = "gcd"
+        elif self.settings.compiler == 'Visual Studio':
+            self.options.parallel_framework = "concurrency"
+        # IPP-ICV binaries are only provided for desktop x86
+        if self.settings.os not in ['Linux', 'Windows', 'Macos'] or \
+                self.settings.arch not in ['x86', 'x86_64']:
+            del self.options.ipp
+        if self.settings.os == 'Android':
+            del self.options.perf_tests
 
     def system_requirements(self):
         if self.settings.os == 'Linux' and tools.os_info.is_linux:
@@ -127,48 +555,160 @@ class OpenCVConan(ConanFile):
                 for package in packages:
                     installer.install(package)
 
-    def requirements(self):
-        self.requires.add('zlib/1.2.11@conan/stable')
+    @property
+    def _requirements(self):
+        requirements = ['zlib/1.2.11@conan/stable']
         if self.options.jpeg:
             # NOTE : use the same libjpeg implementation as jasper uses
             # otherwise, jpeg_create_decompress will fail on version check
             if self.options.jpegturbo:
-                self.requires.add('libjpeg-turbo/1.5.2@bincrafters/stable')
+                requirements.append('libjpeg-turbo/1.5.2@bincrafters/stable')
             else:
-                self.requires.add('libjpeg/9c@bincrafters/stable')
+                requirements.append('libjpeg/9c@bincrafters/stable')
         if self.options.tiff:
-            self.requires.add('libtiff/4.0.9@bincrafters/stable')
+            requirements.append('libtiff/4.0.9@bincrafters/stable')
         if self.options.webp:
-            self.requires.add('libwebp/1.0.0@bincrafters/stable')
+            requirements.append('libwebp/1.0.0@bincrafters/stable')
         if self.options.png:
-            self.requires.add('libpng/1.6.34@bincrafters/stable')
+            requirements.append('libpng/1.6.34@bincrafters/stable')
         if self.options.jasper:
-            self.requires.add('jasper/2.0.14@conan/stable')
+            requirements.append('jasper/2.0.14@conan/stable')
         if self.options.openexr:
-            self.requires.add('openexr/2.3.0@conan/stable')
+            requirements.append('openexr/2.3.0@conan/stable')
         if self.options.protobuf:
             # NOTE : version should be the same as used in OpenCV release,
             # otherwise, PROTOBUF_UPDATE_FILES should be set to re-generate files
-            self.requires.add('protobuf/3.5.2@bincrafters/stable')
+            requirements.append('protobuf/3.5.2@bincrafters/stable')
         if self.options.freetype:
-            self.requires.add('freetype/2.9.1@bincrafters/stable')
+            requirements.append('freetype/2.9.1@bincrafters/stable')
         if self.options.harfbuzz:
-            self.requires.add('harfbuzz/2.4.0@bincrafters/stable')
+            requirements.append('harfbuzz/2.4.0@bincrafters/stable')
         if self.options.eigen:
-            self.requires.add('eigen/3.3.7@conan/stable')
+            requirements.append('eigen/3.3.7@conan/stable')
         if self.options.glog:
-            self.requires.add('glog/0.4.0@bincrafters/stable')
+            requirements.append('glog/0.4.0@bincrafters/stable')
         if self.options.gflags:
-            self.requires.add('gflags/2.2.2@bincrafters/stable')
+            requirements.append('gflags/2.2.2@bincrafters/stable')
+        if self.options.parallel_framework == "tbb":
+            requirements.append('tbb/2019_u4@conan/stable')
+        if self.options.ffmpeg:
+            requirements.append('ffmpeg/4.2@bincrafters/stable')
+        if self.options.lapack:
+            requirements.append('openblas/0.3.7@conan/stable')
+        modules = self._opencv_modules
+        return [requirement for requirement in requirements
+                if self._requirement_modules[requirement.split('/')[0]] in modules]
+
+    def _required(self, name):
+        # the conan package is enabled by the options and consumed by a module being built
+        return name in [requirement.split('/')[0] for requirement in self._requirements]
+
+    def requirements(self):
+        for requirement in self._requirements:
+            self.requires.add(requirement)
+
+    def build_requirements(self):
+        if self.options.ninja:
+            self.build_requires('ninja_installer/1.9.0@bincrafters/stable')
+
+    def package_id(self):
+        # build tooling only, the resulting binaries are the same
+        del self.info.options.compiler_launcher
+        del self.info.options.ninja
+        # run-time defaults, applied through env_info
+        del self.info.options.threads
+        del self.info.options.thread_pool_wait
+        del self.info.options.memalign
+        del self.info.options.opencl_buffer_pool_limit
+
+    @property
+    def _compiler_launcher(self):
+        # full path to ccache/sccache, or None if not used
+        launcher = str(self.options.compiler_launcher)
+        if launcher == "None":
+            return None
+        if launcher == "auto":
+            return tools.which("ccache") or tools.which("sccache")
+        path = tools.which(launcher)
+        if not path:
+            raise ConanException("opencv:compiler_launcher=%s, but %s is not found in PATH" % (launcher, launcher))
+        return path
+
+    @property
+    def _lto_link_flag(self):
+        # consumers (and the PGO training program) have to link LTO objects with the same flag
+        if self.options.lto == "thin":
+            return '-flto=thin'
+        if self.options.lto == "full" and self.settings.compiler != 'Visual Studio':
+            return '-flto'
+        return None
+
+    @property
+    def _gc_sections_link_flag(self):
+        # drops the unreferenced function and data sections, needs objects built with -ffunction-sections
+        if self.settings.compiler == 'Visual Studio':
+            return '/OPT:REF /OPT:ICF'
+        if self.settings.os in ['Macos', 'iOS', 'watchOS', 'tvOS']:
+            return '-Wl,-dead_strip'
+        return '-Wl,--gc-sections'
+
+    def _pgo_flags(self, phase):
+        profile_folder = os.path.join(self.build_folder, self._pgo_profile_folder)
+        if phase == "generate":
+            return '-fprofile-generate=%s' % profile_folder
+        if self.settings.compiler == 'gcc':
+            return '-fprofile-use=%s -fprofile-correction -Wno-missing-profile' % profile_folder
+        return '-fprofile-use=%s -Wno-profile-instr-unprofiled -Wno-profile-instr-out-of-date' % \
+               os.path.join(profile_folder, 'opencv.profdata')
+
+    def _build_environment(self):
+        # Ninja needs the Visual Studio environment, the Visual Studio generator sets it up itself
+        if self.options.ninja and self.settings.compiler == 'Visual Studio':
+            return tools.vcvars(self.settings)
+        return tools.no_op()
+
+    def _dependency_closure(self, name):
+        # the requirement and everything it depends on, each package before its dependencies
+        ordered = []
+
+        def visit(current):
+            if current in ordered:
+                return
+            for dependency in self.deps_cpp_info[current].public_deps:
+                visit(dependency)
+            ordered.append(current)
+
+        visit(name)
+        return list(reversed(ordered))
+
+    @staticmethod
+    def _find_library(dep_cpp_info, name):
+        # full path of a library of a dependency, for the CMake scripts which don't search for it
+        candidates = ['lib%s.a' % name, 'lib%s.so' % name, 'lib%s.dylib' % name, '%s.lib' % name,
+                      'lib%s.lib' % name, 'lib%s.dll.a' % name]
+        for lib_path in dep_cpp_info.lib_paths:
+            for candidate in candidates:
+                if os.path.isfile(os.path.join(lib_path, candidate)):
+                    return os.path.join(lib_path, candidate)
+        raise ConanException("library %s is not found in %s" % (name, dep_cpp_info.rootpath))
 
     def _configure_cmake(self):
-        cmake = CMake(self)
+        # configure once, package() reuses the build tree configured by build()
+        if self._cmake:
+            return self._cmake
+        cmake = CMake(self, generator='Ninja' if self.options.ninja else None)
         cmake.definitions['BUILD_EXAMPLES'] = False
         cmake.definitions['BUILD_DOCS'] = False
         cmake.definitions['BUILD_TESTS'] = False
-        cmake.definitions['BUILD_PERF_TEST'] = False
-        cmake.definitions['WITH_IPP'] = False
-        cmake.definitions['BUILD_IPP_IW'] = False
+        cmake.definitions['BUILD_PERF_TESTS'] = bool(self.options.get_safe("perf_tests"))
+        cmake.definitions['WITH_IPP'] = bool(self.options.get_safe("ipp"))
+        cmake.definitions['BUILD_IPP_IW'] = bool(self.options.get_safe("ipp"))
+        if self.options.get_safe("ipp") and 'OPENCV_IPPICV_PATH' in os.environ:
+            # directory holding the ippicv archive (or the archive itself), used instead of downloading it
+            ippicv_path = os.environ['OPENCV_IPPICV_PATH']
+            if os.path.isfile(ippicv_path):
+                ippicv_path = os.path.dirname(ippicv_path)
+            cmake.definitions['OPENCV_IPPICV_URL'] = self._file_url(ippicv_path)
         cmake.definitions['BUILD_opencv_apps'] = False
         cmake.definitions['BUILD_opencv_java'] = False
         cmake.definitions['BUILD_opencv_python'] = False
@@ -179,6 +719,11 @@ class OpenCVConan(ConanFile):
         cmake.definitions['BUILD_opencv_python_bindings_generator'] = False
         cmake.definitions['BUILD_opencv_js'] = False
         cmake.definitions['BUILD_opencv_java_bindings_generator'] = False
+        if self.options.modules != "all":
+            build_list = self._opencv_modules
+            if self.options.get_safe("perf_tests"):
+                build_list.append("ts")
+            cmake.definitions['BUILD_LIST'] = ','.join(build_list)
 
         if self.settings.compiler == 'Visual Studio':
             cmake.definitions['BUILD_WITH_STATIC_CRT'] = 'MT' in str(
@@ -197,42 +742,97 @@ class OpenCVConan(ConanFile):
         cmake.definitions['BUILD_OPENEXR'] = False
         cmake.definitions['BUILD_WEBP'] = False
         cmake.definitions['BUILD_TBB'] = False
-        cmake.definitions['BUILD_IPP_IW'] = False
-        cmake.definitions['BUILD_ITT'] = False
+        # ITT (VTune instrumentation API) is only built for profiling, see below
+        cmake.definitions['BUILD_ITT'] = self.options.profiling
         cmake.definitions['BUILD_JPEG_TURBO_DISABLE'] = True
         cmake.definitions['BUILD_PROTOBUF'] = False
         cmake.definitions['PROTOBUF_UPDATE_FILES'] = False
 
         cmake.definitions['WITH_GSTREAMER'] = self.options.gstreamer
-        cmake.definitions['WITH_JPEG'] = self.options.jpeg
-        cmake.definitions['WITH_TIFF'] = self.options.tiff
-        cmake.definitions['WITH_WEBP'] = self.options.webp
-        cmake.definitions['WITH_PNG'] = self.options.png
-        cmake.definitions['WITH_JASPER'] = self.options.jasper
-        cmake.definitions['WITH_OPENEXR'] = self.options.openexr
+        # only the libraries required from conan, OpenCV would look for the system ones otherwise
+        cmake.definitions['WITH_JPEG'] = self._required('libjpeg') or self._required('libjpeg-turbo')
+        cmake.definitions['WITH_TIFF'] = self._required('libtiff')
+        cmake.definitions['WITH_WEBP'] = self._required('libwebp')
+        cmake.definitions['WITH_PNG'] = self._required('libpng')
+        cmake.definitions['WITH_JASPER'] = self._required('jasper')
+        cmake.definitions['WITH_OPENEXR'] = self._required('openexr')
         cmake.definitions["WITH_1394"] = self.options.dc1394
-        cmake.definitions['WITH_PROTOBUF'] = self.options.protobuf
-        cmake.definitions['WITH_FFMPEG'] = False
+        cmake.definitions['WITH_PROTOBUF'] = self._required('protobuf')
+        cmake.definitions['WITH_FFMPEG'] = self._required('ffmpeg')
+        if self._required('ffmpeg'):
+            # cmake/FindFFMPEG.cmake maps the conan package, instead of pkg-config or the prebuilt Windows binaries
+            cmake.definitions['OPENCV_FFMPEG_USE_FIND_PACKAGE'] = 'FFMPEG'
+            cmake.definitions['OPENCV_FFMPEG_SKIP_DOWNLOAD'] = True
+            # ffmpeg and its own dependencies only, in link order
+            include_dirs, lib_dirs, libs = [], [], []
+            for name in self._dependency_closure('ffmpeg'):
+                dependency = self.deps_cpp_info[name]
+                include_dirs.extend(dependency.include_paths)
+                lib_dirs.extend(dependency.lib_paths)
+                libs.extend(dependency.libs)
+                libs.extend(getattr(dependency, 'system_libs', []))
+                libs.extend('-framework %s' % framework for framework in getattr(dependency, 'frameworks', []))
+            cmake.definitions['FFMPEG_CONAN_INCLUDE_DIRS'] = ';'.join(include_dirs)
+            cmake.definitions['FFMPEG_CONAN_LIBRARY_DIRS'] = ';'.join(lib_dirs)
+            cmake.definitions['FFMPEG_CONAN_LIBRARIES'] = ';'.join(libs)
         cmake.definitions['WITH_QUIRC'] = False
         cmake.definitions['WITH_CAROTENE'] = self.options.carotene
         cmake.definitions['WITH_CUDA'] = self.options.cuda
         # This allows compilation on older GCC/NVCC, otherwise build errors.
         cmake.definitions['CUDA_NVCC_FLAGS'] = '--expt-relaxed-constexpr'
         cmake.definitions['WITH_EIGEN'] = self.options.eigen
-        
+
+        # SIMD: "default" keeps the upstream choice for the target architecture
+        if self.options.cpu_baseline != "default":
+            cmake.definitions['CPU_BASELINE'] = self.options.cpu_baseline
+        if self.options.cpu_dispatch == "NONE":
+            cmake.definitions['CPU_DISPATCH'] = ''
+        elif self.options.cpu_dispatch != "default":
+            cmake.definitions['CPU_DISPATCH'] = ';'.join(self._cpu_dispatch_list)
+
+        # parallel_for_ backend, at most one of them is enabled; gcd and concurrency have no CMake option,
+        # parallel.cpp uses them on Apple platforms and with MSVC when tbb and openmp are disabled
+        parallel_framework = str(self.options.parallel_framework)
+        cmake.definitions['WITH_TBB'] = parallel_framework == 'tbb'
+        cmake.definitions['WITH_OPENMP'] = parallel_framework == 'openmp'
+        cmake.definitions['WITH_PTHREADS_PF'] = parallel_framework == 'pthreads'
+        if parallel_framework == 'tbb':
+            # tbb library itself is found by find_library through CMAKE_PREFIX_PATH set by conan
+            cmake.definitions['TBB_ENV_INCLUDE'] = self.deps_cpp_info['tbb'].include_paths[0]
+
+        # OpenCL: the runtime is loaded dynamically (OPENCV_OPENCL_RUNTIME selects the library, e.g. POCL)
+        # except on Apple platforms, which link the OpenCL framework. Vendor extras stay disabled
+        cmake.definitions['WITH_OPENCL'] = self.options.opencl
+        cmake.definitions['WITH_OPENCLAMDFFT'] = False
+        cmake.definitions['WITH_OPENCLAMDBLAS'] = False
+        cmake.definitions['WITH_VA_INTEL'] = False
+
+        # LAPACK/BLAS used by gemm, solve, SVD, etc. OpenCV doesn't use find_package for OpenBLAS,
+        # so let's specify it
+        cmake.definitions['WITH_LAPACK'] = self.options.lapack
+        if self.options.lapack:
+            openblas = self.deps_cpp_info['openblas']
+            cmake.definitions['LAPACK_IMPL'] = 'OpenBLAS'
+            cmake.definitions['LAPACK_INCLUDE_DIR'] = openblas.include_paths[0]
+            # OpenCV's try_compile check links exactly these, a static OpenBLAS needs its system libs too
+            cmake.definitions['LAPACK_LIBRARIES'] = ';'.join([self._find_library(openblas, 'openblas')] +
+                                                             openblas.system_libs)
+            cmake.definitions['LAPACK_CBLAS_H'] = 'cblas.h'
+            cmake.definitions['LAPACK_LAPACKE_H'] = 'lapacke.h'
+
         # MinGW doesn't build wih Media Foundation
         cmake.definitions['WITH_MSMF'] = self.settings.compiler == 'Visual Studio'
 
         # OpenCV doesn't use find_package for freetype & harfbuzz, so let's specify them
-        if self.options.freetype:
+        if self._required('freetype'):
             cmake.definitions['FREETYPE_FOUND'] = True
             cmake.definitions['FREETYPE_LIBRARIES'] = ';'.join(self.deps_cpp_info['freetype'].libs)
             cmake.definitions['FREETYPE_INCLUDE_DIRS'] = ';'.join(self.deps_cpp_info['freetype'].includedirs)
-        if self.options.harfbuzz:
+        if self._required('harfbuzz'):
             cmake.definitions['HARFBUZZ_FOUND'] = True
             cmake.definitions['HARFBUZZ_LIBRARIES'] = ';'.join(self.deps_cpp_info['harfbuzz'].libs)
             cmake.definitions['HARFBUZZ_INCLUDE_DIRS'] = ';'.join(self.deps_cpp_info['harfbuzz'].includedirs)
-        if self.options.openexr:
+        if self._required('openexr'):
             cmake.definitions['OPENEXR_ROOT'] = self.deps_cpp_info['openexr'].rootpath
 
         # system libraries
@@ -240,10 +840,20 @@ class OpenCVConan(ConanFile):
             cmake.definitions['WITH_GTK'] = self.options.gtk is not None
             cmake.definitions['WITH_GTK_2_X'] = self.options.gtk == 2
 
-        if self.options.contrib:
+        if self._contrib_required:
             cmake.definitions['OPENCV_EXTRA_MODULES_PATH'] = os.path.join(
                 self.build_folder, 'contrib', 'modules')
 
+        # files downloaded by OpenCV's CMake scripts (ippicv, ADE, contrib models): a shared cache,
+        # and the mirror tried before the upstream locations
+        if os.environ.get('OPENCV_SOURCE_CACHE'):
+            cmake.definitions['OPENCV_DOWNLOAD_PATH'] = os.path.join(os.environ['OPENCV_SOURCE_CACHE'], 'downloads')
+        if self._mirror_url:
+            for variable in ['OPENCV_IPPICV_URL', 'OPENCV_ADE_URL', 'OPENCV_FACE_ALIGNMENT_URL',
+                             'OPENCV_BOOSTDESC_URL', 'OPENCV_VGGDESC_URL']:
+                if variable not in cmake.definitions:
+                    cmake.definitions[variable] = self._mirror_url
+
         if self.options.nonfree:
             cmake.definitions['OPENCV_ENABLE_NONFREE'] = True
 
@@ -268,123 +878,377 @@ class OpenCVConan(ConanFile):
                 cmake.definitions['ANDROID_NDK'] = os.environ.get(
                     'ANDROID_NDK_HOME')
 
-        cmake.configure(build_folder=self._build_subfolder)
+        launcher = self._compiler_launcher
+        if launcher and cmake.is_multi_configuration and not self.options.ninja:
+            self.output.warn("compiler launcher is not supported by the %s generator" % cmake.generator)
+            launcher = None
+        if launcher:
+            cmake.definitions['CMAKE_C_COMPILER_LAUNCHER'] = launcher
+            cmake.definitions['CMAKE_CXX_COMPILER_LAUNCHER'] = launcher
+        # precompiled headers are supported by OpenCV for Visual Studio and GCC only,
+        # and are not cacheable by sccache
+        use_pch = self.settings.compiler in ['Visual Studio', 'gcc'] and not tools.cross_building(self.settings)
+        if launcher and os.path.basename(launcher).startswith('sccache'):
+            use_pch = False
+        cmake.definitions['ENABLE_PRECOMPILED_HEADERS'] = use_pch
+
+        # link-time and profile-guided optimization
+        extra_flags = []
+        cmake.definitions['ENABLE_THIN_LTO'] = self.options.lto == "thin"
+        # OpenCV's ENABLE_LTO handles GCC and Visual Studio only
+        cmake.definitions['ENABLE_LTO'] = self.options.lto == "full" and \
+            self.settings.compiler in ['gcc', 'Visual Studio']
+        if self.options.lto == "full" and self.settings.compiler in ['clang', 'apple-clang']:
+            extra_flags.append('-flto')
+        if self.options.lto and self.settings.compiler == 'gcc' and tools.which('gcc-ar'):
+            # static libraries of LTO objects need the wrappers loading the LTO plugin
+            cmake.definitions['CMAKE_AR'] = tools.which('gcc-ar')
+            cmake.definitions['CMAKE_RANLIB'] = tools.which('gcc-ranlib')
+        if self.options.lto and self.settings.compiler in ['clang', 'apple-clang']:
+            # the system ar doesn't index LLVM bitcode, the static libraries (3rdparty ones too) are archived by llvm-ar
+            llvm_ar, llvm_ranlib = tools.which('llvm-ar'), tools.which('llvm-ranlib')
+            if not llvm_ar or not llvm_ranlib:
+                raise ConanException("llvm-ar and llvm-ranlib are required to archive the LTO objects")
+            cmake.definitions['CMAKE_AR'] = llvm_ar
+            cmake.definitions['CMAKE_RANLIB'] = llvm_ranlib
+        if self.options.pgo:
+            extra_flags.append(self._pgo_flags(self._pgo_phase))
+            if self._pgo_phase == "generate":
+                cmake.definitions['CMAKE_INSTALL_PREFIX'] = os.path.join(self.build_folder,
+                                                                         self._pgo_install_folder)
+        compile_flags = list(extra_flags)
+        link_flags = list(extra_flags)
+
+        # size: only the exported API is visible, one section per function/variable so the linker can drop
+        # the unused ones. OpenCV hides symbols by default already, make sure it stays so
+        if self.options.minimize_size:
+            cmake.definitions['OPENCV_SKIP_VISIBILITY_HIDDEN'] = False
+            if self.settings.compiler == 'Visual Studio':
+                compile_flags.extend(['/Gy', '/Gw'])
+            else:
+                compile_flags.extend(['-ffunction-sections', '-fdata-sections'])
+            link_flags.append(self._gc_sections_link_flag)
+        # profiling: OpenCV trace regions (OPENCV_TRACE=1 at run time) reported to ITT as well, frame pointers
+        # for the stack unwinding of sampling profilers, and debug info along with the optimizations
+        if self.options.profiling:
+            cmake.definitions['WITH_ITT'] = True
+            cmake.definitions['CV_TRACE'] = True
+            optimized = str(self.settings.build_type) in ['Release', 'MinSizeRel']
+            if self.settings.compiler == 'Visual Studio':
+                compile_flags.append('/Oy-')
+                if optimized:
+                    compile_flags.append('/Zi')
+                    link_flags.append('/DEBUG')
+            else:
+                compile_flags.append('-fno-omit-frame-pointer')
+                if str(self.settings.arch) in ['x86', 'x86_64']:
+                    compile_flags.append('-mno-omit-leaf-frame-pointer')
+                if optimized:
+                    compile_flags.append('-g')
+        if self.settings.compiler == 'Visual Studio':
+            # the debug info is always apart from the binaries, in the PDBs, which are left out by strip only
+            cmake.definitions['INSTALL_PDB'] = self.options.debug_info != "strip"
+
+        if compile_flags:
+            cmake.definitions['OPENCV_EXTRA_C_FLAGS'] = ' '.join(compile_flags)
+            cmake.definitions['OPENCV_EXTRA_CXX_FLAGS'] = ' '.join(compile_flags)
+        if link_flags:
+            cmake.definitions['CMAKE_EXE_LINKER_FLAGS'] = ' '.join(link_flags)
+            cmake.definitions['CMAKE_SHARED_LINKER_FLAGS'] = ' '.join(link_flags)
+
+        with self._timed("pgo.configure" if self._pgo_phase == "generate" else "configure"):
+            cmake.configure(build_folder=self._build_subfolder)
+        self._cmake = cmake
         return cmake
 
     def build(self):
-        # https://github.com/opencv/opencv/issues/8010
-        if str(self.settings.compiler) == 'clang' and str(self.settings.compiler.version) == '3.9':
-            tools.replace_in_file(os.path.join(self._source_subfolder, 'modules', 'imgproc', 'CMakeLists.txt'),
-                                  'ocv_define_module(imgproc opencv_core WRAP java python js)',
-                                  'ocv_define_module(imgproc opencv_core WRAP java python js)\n'
-                                  'set_source_files_properties(${CMAKE_CURRENT_LIST_DIR}/src/'
-                                  'imgwarp.cpp PROPERTIES COMPILE_FLAGS "-O0")')
+        with self._timed("patch"):
+            # https://github.com/opencv/opencv/issues/8010
+            if str(self.settings.compiler) == 'clang' and str(self.settings.compiler.version) == '3.9':
+                tools.replace_in_file(os.path.join(self._source_subfolder, 'modules', 'imgproc', 'CMakeLists.txt'),
+                                      'ocv_define_module(imgproc opencv_core WRAP java python js)',
+                                      'ocv_define_module(imgproc opencv_core WRAP java python js)\n'
+                                      'set_source_files_properties(${CMAKE_CURRENT_LIST_DIR}/src/'
+                                      'imgwarp.cpp PROPERTIES COMPILE_FLAGS "-O0")')
 
-        tools.patch(base_path=self._source_subfolder,
-                    patch_file=os.path.join("patches", "0001-fix-FindOpenEXR-for-conan.patch"))
+            tools.patch(base_path=self._source_subfolder,
+                        patch_file=os.path.join("patches", "0001-fix-FindOpenEXR-for-conan.patch"))
 
+        if self._contrib_required:
+            with self._timed("source_contrib"):
+                self._source_contrib()
+
+        # ccache hashes the PCH, ignore the defines and time macros which differ between builds
+        launcher = self._compiler_launcher
+        env = {}
+        if launcher and os.path.basename(launcher).startswith('ccache') and 'CCACHE_SLOPPINESS' not in os.environ:
+            env['CCACHE_SLOPPINESS'] = 'pch_defines,time_macros'
+        cache_stats = self._compiler_cache_stats()
+        with tools.environment_append(env):
+            with self._build_environment():
+                if self.options.pgo:
+                    self._build_pgo_profile()
+                cmake = self._configure_cmake()
+                self._check_lapack()
+                with self._timed("compile"):
+                    cmake.build()
+        self._report_build(cache_stats)
+
+        if self.options.get_safe("perf_tests"):
+            if tools.cross_building(self.settings):
+                self.output.warn("perf tests are not run when cross-building")
+            else:
+                with self._timed("perf_tests"):
+                    with tools.environment_append(self._runtime_defaults):
+                        self._run_perf_tests()
+
+    def _check_lapack(self):
+        # OpenCV silently disables LAPACK when its check fails
+        if not self.options.lapack:
+            return
+        cvconfig = tools.load(os.path.join(self.build_folder, self._build_subfolder, 'cvconfig.h'))
+        if not re.search(r'#define HAVE_LAPACK\b', cvconfig):
+            raise ConanException("opencv:lapack=True, but OpenCV didn't enable LAPACK, see the CMake output")
+
+    def _report_build(self, cache_stats_before):
+        report = self._load_report()
+        object_files = 0
+        for _, _, files in os.walk(os.path.join(self.build_folder, self._build_subfolder)):
+            object_files += len([name for name in files if name.endswith(('.o', '.obj'))])
+        report["translation_units"] = object_files
+        cache_stats = self._compiler_cache_stats()
+        if cache_stats_before and cache_stats:
+            hits = cache_stats[0] - cache_stats_before[0]
+            misses = cache_stats[1] - cache_stats_before[1]
+            report["compiler_cache"] = {"launcher": os.path.basename(self._compiler_launcher),
+                                        "hits": hits,
+                                        "misses": misses,
+                                        "hit_rate": round(float(hits) / (hits + misses), 3) if hits + misses else None}
+        self._save_report()
+
+    def _build_pgo_profile(self):
+        if tools.cross_building(self.settings):
+            raise ConanException("opencv:pgo cannot run the training workload when cross-building")
+        profile_folder = os.path.join(self.build_folder, self._pgo_profile_folder)
+        install_folder = os.path.join(self.build_folder, self._pgo_install_folder)
+        tools.rmdir(profile_folder)
+        tools.mkdir(profile_folder)
+
+        # 1. instrumented build, installed into the build folder. It is built in the same folder
+        # as the final one, so GCC finds the profile of each object file by its path
+        self._pgo_phase = "generate"
         cmake = self._configure_cmake()
-        cmake.build()
+        with self._timed("pgo.compile"):
+            cmake.build()
+        with self._timed("pgo.install"):
+            cmake.install()
+        self._cmake = None
+        self._pgo_phase = "use"
+
+        # 2. training workload: OPENCV_PGO_TRAINING command, or the test_package detection benchmark
+        lib_folder = os.path.join(install_folder, 'lib')
+        env = {'OPENCV_PGO_PREFIX': install_folder,
+               'LD_LIBRARY_PATH': [lib_folder],
+               'DYLD_LIBRARY_PATH': [lib_folder]}
+        training = os.environ.get('OPENCV_PGO_TRAINING')
+        training_folder = self.build_folder
+        if not training:
+            training_cmake = CMake(self)
+            training_cmake.definitions['OpenCV_DIR'] = os.path.join(lib_folder, 'cmake', 'opencv4')
+            training_cmake.definitions['CMAKE_EXE_LINKER_FLAGS'] = ' '.join(
+                flag for flag in [self._pgo_flags("generate"), self._lto_link_flag] if flag)
+            training_cmake.configure(source_folder='pgo', build_folder='pgo_training')
+            training_cmake.build()
+            training_folder = os.path.join(self.build_folder, 'pgo_training', 'bin')
+            tools.rmdir(os.path.join(training_folder, 'haarcascades'))
+            shutil.copytree(os.path.join(install_folder, 'share', 'opencv4', 'haarcascades'),
+                            os.path.join(training_folder, 'haarcascades'))
+            shutil.copy(os.path.join(self.build_folder, 'test_package', 'lena.jpg'), training_folder)
+            training = './lena --benchmark --frames=16 --workers=2'
+        with self._timed("pgo.training"):
+            with tools.chdir(training_folder):
+                with tools.environment_append(env):
+                    self.run(training, run_environment=True)
+
+        # 3. clang writes raw profiles which have to be merged
+        if self.settings.compiler in ['clang', 'apple-clang']:
+            llvm_profdata = tools.which('llvm-profdata')
+            if not llvm_profdata:
+                raise ConanException("llvm-profdata is required to merge the PGO profiles")
+            self.run('"%s" merge -output="%s" %s' % (
+                llvm_profdata, os.path.join(profile_folder, 'opencv.profdata'),
+                ' '.join('"%s"' % profile for profile in glob.glob(os.path.join(profile_folder, '*.profraw')))))
+
+    def _run_perf_tests(self):
+        # test data is looked up by OpenCV itself from OPENCV_TEST_DATA_PATH (opencv_extra/testdata)
+        if 'OPENCV_TEST_DATA_PATH' not in os.environ:
+            self.output.warn("OPENCV_TEST_DATA_PATH is not set, perf tests needing data will fail")
+        samples = os.environ.get('OPENCV_PERF_SAMPLES', '10')
+        gtest_filter = os.environ.get('OPENCV_PERF_FILTER', '*')
+        results_folder = os.path.join(self.build_folder, self._perf_results_folder)
+        tools.mkdir(results_folder)
+        exe_suffix = '.exe' if self.settings.os == 'Windows' else ''
+        bin_folders = [os.path.join(self.build_folder, self._build_subfolder, 'bin', str(self.settings.build_type)),
+                       os.path.join(self.build_folder, self._build_subfolder, 'bin')]
+
+        results = []
+        for module in self._perf_modules:
+            if module not in self._opencv_modules:
+                continue
+            executables = [os.path.join(folder, 'opencv_perf_%s%s' % (module, exe_suffix)) for folder in bin_folders]
+            executables = [executable for executable in executables if os.path.isfile(executable)]
+            if not executables:
+                self.output.warn("opencv_perf_%s was not built" % module)
+                continue
+            xml_file = os.path.join(results_folder, 'opencv_perf_%s.xml' % module)
+            command = '"%s" --gtest_filter="%s" --gtest_output=xml:"%s" ' \
+                      '--perf_min_samples=%s --perf_force_samples=%s' % \
+                      (executables[0], gtest_filter, xml_file, samples, samples)
+            try:
+                self.run(command, run_environment=True)
+            except ConanException as e:
+                self.output.warn("opencv_perf_%s failed: %s" % (module, e))
+            if os.path.isfile(xml_file):
+                results.extend(self._parse_perf_results(module, xml_file))
+
+        summary = {"settings": dict((name, str(value)) for name, value in self.settings.values_list),
+                   "options": dict((name, str(value)) for name, value in self.options.items()),
+                   "samples": int(samples),
+                   "filter": gtest_filter,
+                   "results": results}
+        tools.save(os.path.join(results_folder, 'summary.json'), json.dumps(summary, indent=4, sort_keys=True))
+        self.output.info("perf results written to %s" % results_folder)
+
+    @staticmethod
+    def _parse_perf_results(module, xml_file):
+        # OpenCV perf framework records timings in ticks as attributes of each testcase
+        results = []
+        for testcase in ElementTree.parse(xml_file).getroot().iter('testcase'):
+            attributes = testcase.attrib
+            if 'frequency' not in attributes:
+                continue
+            frequency = float(attributes['frequency'])
+            result = {"module": module,
+                      "name": "%s.%s" % (attributes.get('classname'), attributes.get('name')),
+                      "samples": int(attributes.get('samples', 0)),
+                      "outliers": int(attributes.get('outliers', 0))}
+            for metric in ['min', 'median', 'gmean', 'mean', 'stddev']:
+                if metric in attributes:
+                    result["%s_ms" % metric] = float(attributes[metric]) * 1000.0 / frequency
+            results.append(result)
+        return results
 
     def package(self):
         self.copy("LICENSE", dst="licenses", src=self._source_subfolder)
-        cmake = self._configure_cmake()
-        cmake.install()
-        cmake.patch_config_paths()
+        with self._build_environment():
+            cmake = self._configure_cmake()
+            with self._timed("install"):
+                cmake.install()
+        with self._timed("patch_config_paths"):
+            cmake.patch_config_paths()
+        self._remove_unrequested_data()
+        if self.options.debug_info != "keep" and self.settings.compiler != 'Visual Studio':
+            with self._timed("strip"):
+                self._strip_debug_info()
+        self._save_cpu_features()
+
+        # phase timings, build statistics and the CMake definitions the package was built with
+        report = self._load_report()
+        report["cmake_definitions"] = dict((name, str(value)) for name, value in cmake.definitions.items())
+        self._save_report(self.package_folder)
+
+    def _remove_unrequested_data(self):
+        for root, folders, _ in os.walk(self.package_folder):
+            for folder in list(folders):
+                if folder in self._data_folders and folder not in self._data_list:
+                    tools.rmdir(os.path.join(root, folder))
+                    folders.remove(folder)
 
-    def add_libraries_from_pc(self, library):
+    def _binary_tool(self, name):
+        # e.g. STRIP=aarch64-linux-gnu-strip when cross-building
+        path = os.environ.get(name.upper()) or tools.which(name)
+        if not path:
+            raise ConanException("opencv:debug_info=%s requires %s" % (self.options.debug_info, name))
+        return path
+
+    def _strip_debug_info(self):
+        # split: the debug info is kept in lib/.debug (dSYM bundles next to the libraries on Apple platforms),
+        # found by the debuggers through the debug link. Static libraries are only stripped
+        apple = self.settings.os in ['Macos', 'iOS', 'watchOS', 'tvOS']
+        strip = self._binary_tool('strip')
+        libraries = []
+        for root, _, files in os.walk(self.package_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    continue
+                if name.endswith(('.a', '.dylib')) or re.search(r'\.so(\.\d+)*$', name):
+                    libraries.append(path)
+        for library in libraries:
+            static = library.endswith('.a')
+            if self.options.debug_info == "split" and not static:
+                if apple:
+                    self.run('"%s" "%s" -o "%s.dSYM"' % (self._binary_tool('dsymutil'), library, library))
+                else:
+                    objcopy = self._binary_tool('objcopy')
+                    debug_folder = os.path.join(os.path.dirname(library), '.debug')
+                    debug_file = os.path.join(debug_folder, os.path.basename(library) + '.debug')
+                    tools.mkdir(debug_folder)
+                    self.run('"%s" --only-keep-debug "%s" "%s"' % (objcopy, library, debug_file))
+                    self.run('"%s" --strip-debug "%s"' % (strip, library))
+                    self.run('"%s" --add-gnu-debuglink="%s" "%s"' % (objcopy, debug_file, library))
+                    continue
+            self.run('"%s" %s "%s"' % (strip, '-S' if apple else '--strip-debug', library))
+
+    def _save_cpu_features(self):
+        # cv_cpu_config.h is generated by OpenCV with the ISA set actually compiled in
+        cpu_config = os.path.join(self.build_folder, self._build_subfolder, 'cv_cpu_config.h')
+        if not os.path.isfile(cpu_config):
+            return
+        content = tools.load(cpu_config)
+        features = {"baseline": re.findall(r'#define CV_CPU_BASELINE_COMPILE_(\w+) 1', content),
+                    "dispatch": re.findall(r'#define CV_CPU_DISPATCH_COMPILE_(\w+) 1', content)}
+        tools.save(os.path.join(self.package_folder, self._cpu_features_file),
+                   json.dumps(features, indent=4))
+
+    def add_libraries_from_pc(self, library, component):
         pkg_config = tools.PkgConfig(library)
         libs = [lib[2:] for lib in pkg_config.libs_only_l]  # cut -l prefix
         lib_paths = [lib[2:]
                      for lib in pkg_config.libs_only_L]  # cut -L prefix
-        self.cpp_info.libs.extend(libs)
-        self.cpp_info.libdirs.extend(lib_paths)
-        self.cpp_info.sharedlinkflags.extend(pkg_config.libs_only_other)
-        self.cpp_info.exelinkflags.extend(pkg_config.libs_only_other)
-
-    def package_info(self):
-        opencv_libs = ["stitching",
-                       "photo",
-                       "video",
-                       "ml",
-                       "calib3d",
-                       "features2d",
-                       "highgui",
-                       "videoio",
-                       "flann",
-                       "imgcodecs",
-                       "objdetect",
-                       "imgproc",
-                       "core",
-                       "dnn"]
+        component.system_libs.extend(libs)
+        component.libdirs.extend(lib_paths)
+        component.sharedlinkflags.extend(pkg_config.libs_only_other)
+        component.exelinkflags.extend(pkg_config.libs_only_other)
 
-        if not self.options.protobuf:
-                opencv_libs.remove("dnn")
+    @property
+    def _built_modules(self):
+        # opencv_modules.hpp defines HAVE_OPENCV_<MODULE> for every module actually built
+        for include_dir in [os.path.join('include', 'opencv4'),
+                            os.path.join('sdk', 'native', 'jni', 'include')]:
+            header = os.path.join(self.package_folder, include_dir, 'opencv2', 'opencv_modules.hpp')
+            if os.path.isfile(header):
+                return [name.lower() for name in re.findall(r'#define HAVE_OPENCV_(\w+)', tools.load(header))]
+        return None
 
-        if self.settings.os != 'Android':
-            # gapi depends on ade but ade disabled for Android
-            # https://github.com/opencv/opencv/blob/4.0.1/modules/gapi/cmake/DownloadADE.cmake#L2
-            opencv_libs.append("gapi")
-
-        if self.options.contrib:
-            opencv_libs = [
-                "aruco",
-                "bgsegm",
-                "bioinspired",
-                "ccalib",
-                "datasets",
-                "dpm",
-                "face",
-                "freetype",
-                "fuzzy",
-                "hfs",
-                "img_hash",
-                "line_descriptor",
-                "optflow",
-                "phase_unwrapping",
-                "plot",
-                "reg",
-                "rgbd",
-                "saliency",
-                "shape",
-                "stereo",
-                "structured_light",
-                "superres",
-                "surface_matching",
-                "tracking",
-                "videostab",
-                "xfeatures2d",
-                "ximgproc",
-                "xobjdetect",
-                "xphoto",
-                "sfm"] + opencv_libs
-        
-            if not self.options.freetype or not self.options.harfbuzz:
-                opencv_libs.remove("freetype")
-            if not self.options.eigen or not self.options.glog or not self.options.gflags:
-                opencv_libs.remove("sfm")
-
-        if self.options.cuda:
-            opencv_libs = ["cudaarithm",
-                            "cudabgsegm",
-                            "cudacodec",
-                            "cudafeatures2d",
-                            "cudafilters",
-                            "cudaimgproc",
-                            "cudalegacy",
-                            "cudaobjdetect",
-                            "cudaoptflow",
-                            "cudastereo",
-                            "cudawarping",
-                            "cudev"
-                            ] + opencv_libs
+    def package_info(self):
+        opencv_libs = self._opencv_modules
+        built_modules = self._built_modules
+        if built_modules is not None:
+            # the modules OpenCV actually built: it silently skips modules whose optional 3rd-party requirements
+            # are not met, and builds contrib modules missing from _module_dependencies (ts isn't installed).
+            # The unknown ones are listed first, they can only depend on the known ones
+            known_modules = [name for name in opencv_libs if name in built_modules]
+            opencv_libs = [name for name in built_modules if name not in known_modules and name != "ts"] + \
+                known_modules
 
         suffix = 'd' if self.settings.build_type == 'Debug' and self.settings.compiler == 'Visual Studio' else ''
         version = self.version.replace(
             ".", "") if self.settings.os == "Windows" else ""
-        for lib in opencv_libs:
-            self.cpp_info.libs.append("opencv_%s%s%s" % (lib, version, suffix))
 
+        includedirs = ['include']
+        libdirs = ['lib']
+        bindirs = ['bin']
         opencv_lib = 'lib' if self.options.shared else 'staticlib'
         opencv_arch = {'x86': 'x86',
                        'x86_64': 'x64',
@@ -393,57 +1257,117 @@ class OpenCVConan(ConanFile):
         opencv_runtime = None
         if self.settings.compiler == 'Visual Studio':
             opencv_runtime = 'vc%s' % str(self.settings.compiler.version)
-            if self.options.cuda:
+        if self.settings.os == "Windows" and self.settings.compiler == "gcc":
+            opencv_runtime = 'mingw'
+        if opencv_runtime:
+            bindirs.append(os.path.join(opencv_arch, opencv_runtime, 'bin'))
+            libdirs.append(os.path.join(opencv_arch, opencv_runtime, opencv_lib))
+        if self.settings.os == 'Android' and not self.options.shared:
+            includedirs.append(os.path.join('sdk', 'native', 'jni', 'include'))
+            libdirs.append(os.path.join('sdk', 'native', 'staticlibs'))
+        else:
+            includedirs.append(os.path.join('include', 'opencv4'))
+            libdirs.append(os.path.join('lib', 'opencv4', '3rdparty'))
+
+        # one component per module, e.g. opencv::imgproc, linking only its own dependency closure
+        for lib in opencv_libs:
+            component = self.cpp_info.components[lib]
+            component.names["cmake_find_package"] = lib
+            component.names["cmake_find_package_multi"] = lib
+            component.names["pkg_config"] = "opencv_%s" % lib
+            component.libs = ["opencv_%s%s%s" % (lib, version, suffix)]
+            # an unknown contrib module may link any known module, requiring them all keeps static links complete
+            dependencies = self._module_dependencies[lib] if lib in self._module_dependencies else \
+                [name for name in opencv_libs if name in self._module_dependencies]
+            component.requires = [dependency for dependency in dependencies
+                                  if dependency in opencv_libs and dependency != lib]
+            component.includedirs = list(includedirs)
+            component.libdirs = list(libdirs)
+            component.bindirs = list(bindirs)
+        components = self.cpp_info.components
+
+        for requirement in self._requirements:
+            name = requirement.split('/')[0]
+            module = self._requirement_modules[name]
+            if module not in opencv_libs:
+                # OpenCV skipped the module at build time, conan requires every requirement to be used
+                module = "core"
+            components[module].requires.append("%s::%s" % (name, name))
+
+        if self.options.get_safe("ipp") and not self.options.shared:
+            # static IPP-ICV/IW libraries are installed into the 3rdparty folder
+            if self.settings.os == 'Windows':
+                components["core"].libs.extend(['ippiw%s' % suffix, 'ippicvmt'])
+            else:
+                components["core"].libs.extend(['ippiw', 'ippicv'])
+
+        if self.options.cuda:
+            components["core"].system_libs.extend(["nvrtc", "cudart", "cuda"])
+            if self.settings.compiler == 'Visual Studio':
                 cuda_platform = {'x86': 'Win32',
                                  'x86_64': 'x64'}.get(str(self.settings.arch))
                 cuda_path = os.environ.get('CUDA_PATH')
-                self.cpp_info.libdirs.append(os.path.join(cuda_path, "lib", cuda_platform))
+                components["core"].libdirs.append(os.path.join(cuda_path, "lib", cuda_platform))
 
-        if self.settings.os == "Windows" and self.settings.compiler == "gcc":
-            opencv_runtime = 'mingw'
+        if self.options.parallel_framework == "openmp" and self.settings.compiler in ["gcc", "clang"]:
+            components["core"].sharedlinkflags.append('-fopenmp')
+            components["core"].exelinkflags.append('-fopenmp')
 
-        if opencv_runtime:
-            bindir = os.path.join(self.package_folder, opencv_arch, opencv_runtime, 'bin')
-            libdir = os.path.join(self.package_folder, opencv_arch, opencv_runtime, opencv_lib)
-            self.cpp_info.bindirs.append(bindir)
-            self.cpp_info.libdirs.append(libdir)
+        if self._lto_link_flag and not self.options.shared:
+            components["core"].sharedlinkflags.append(self._lto_link_flag)
+            components["core"].exelinkflags.append(self._lto_link_flag)
 
-        if self.options.cuda:
-            self.cpp_info.libs.extend(["nvrtc", "cudart", "cuda"])
+        if self.options.profiling and not self.options.shared:
+            # static ITT library, when OpenCV supports it on the platform
+            for libdir in components["core"].libdirs:
+                if glob.glob(os.path.join(self.package_folder, libdir, '*ittnotify*')):
+                    components["core"].libs.append('ittnotify%s' % suffix)
+                    break
+
+        if self.options.minimize_size and not self.options.shared and self.settings.compiler != 'Visual Studio':
+            # the static libraries are built with function/data sections, the consumer's linker drops
+            # what it doesn't use
+            components["core"].sharedlinkflags.append(self._gc_sections_link_flag)
+            components["core"].exelinkflags.append(self._gc_sections_link_flag)
 
         if self.settings.os == "Linux":
-            self.cpp_info.libs.extend([
+            components["core"].system_libs.extend([
                 "pthread",
                 "m",
                 "dl"])
-            if self.options.gtk == 2:
-                self.add_libraries_from_pc('gtk+-2.0')
-            elif self.options.gtk == 3:
-                self.add_libraries_from_pc('gtk+-3.0')
+            if "highgui" in opencv_libs:
+                if self.options.gtk == 2:
+                    self.add_libraries_from_pc('gtk+-2.0', components["highgui"])
+                elif self.options.gtk == 3:
+                    self.add_libraries_from_pc('gtk+-3.0', components["highgui"])
         elif self.settings.os == 'Macos':
-            for framework in ['OpenCL',
-                              'Accelerate',
-                              'CoreMedia',
-                              'CoreVideo',
-                              'CoreGraphics',
-                              'AVFoundation',
-                              'QuartzCore',
-                              'Cocoa']:
-                self.cpp_info.exelinkflags.append('-framework %s' % framework)
-            self.cpp_info.sharedlinkflags = self.cpp_info.exelinkflags
+            components["core"].frameworks.append('Accelerate')
+            if self.options.opencl:
+                components["core"].frameworks.append('OpenCL')
+            if "videoio" in opencv_libs:
+                components["videoio"].frameworks.extend(['CoreMedia', 'CoreVideo', 'AVFoundation', 'QuartzCore'])
+            if "highgui" in opencv_libs:
+                components["highgui"].frameworks.extend(['CoreGraphics', 'Cocoa'])
         elif self.settings.os == 'Windows':
-            self.cpp_info.libs.append('Vfw32')
-        if self.settings.os == 'Android' and not self.options.shared:
-            self.cpp_info.includedirs.append(
-                os.path.join('sdk', 'native', 'jni', 'include'))
-            self.cpp_info.libdirs.append(
-                os.path.join('sdk', 'native', 'staticlibs'))
-        else:
-            self.cpp_info.includedirs.append(
-                os.path.join('include', 'opencv4'))
-            self.cpp_info.libdirs.append(
-                os.path.join('lib', 'opencv4', '3rdparty'))
-            if not self.options.shared:
-                self.cpp_info.libs.append('ade')
-        if self.options.contrib and self.options.eigen and self.options.glog and self.options.gflags:
-            self.cpp_info.libs.append('multiview')
+            if "videoio" in opencv_libs:
+                components["videoio"].system_libs.append('Vfw32')
+        if not (self.settings.os == 'Android' and not self.options.shared):
+            if not self.options.shared and "gapi" in opencv_libs:
+                components["gapi"].libs.append('ade')
+        if "sfm" in opencv_libs:
+            components["sfm"].libs.append('multiview')
+
+        # run-time defaults in the consumers' environment, and the thread count for the code which calls
+        # cv::setNumThreads() itself
+        for name, value in sorted(self._runtime_defaults.items()):
+            setattr(self.env_info, name, value)
+        if self.options.threads != "default":
+            components["core"].defines.append('OPENCV_CONAN_DEFAULT_THREADS=%s' % self.options.threads)
+
+        cpu_features = os.path.join(self.package_folder, self._cpu_features_file)
+        if os.path.isfile(cpu_features):
+            features = json.loads(tools.load(cpu_features))
+            self.output.info("CPU baseline: %s" % ' '.join(features["baseline"]))
+            self.output.info("CPU dispatch: %s" % ' '.join(features["dispatch"]))
+            self.user_info.CPU_BASELINE = ';'.join(features["baseline"])
+            self.user_info.CPU_DISPATCH = ';'.join(features["dispatch"])
@@ -0,0 +1,92 @@
+#ifndef BENCHMARK_UTILS_HPP
+#define BENCHMARK_UTILS_HPP
+
+#include <algorithm>
+#include <chrono>
+#include <cstdlib>
+#include <cstring>
+#include <sstream>
+#include <string>
+#include <vector>
+
+#if defined(_WIN32)
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#include <psapi.h>
+#else
+#include <sys/resource.h>
+#endif
+
+/** Small helpers shared by the test_package benchmarks */
+namespace bench {
+
+typedef std::chrono::steady_clock Clock;
+
+inline double elapsedMs( Clock::time_point start ){
+    return std::chrono::duration<double, std::milli>(Clock::now() - start).count();
+}
+
+/** p-th percentile (0..100) of the values, nearest rank */
+inline double percentile( std::vector<double> values, double p ){
+    if( values.empty() )
+        return 0.0;
+    std::sort(values.begin(), values.end());
+    size_t index = static_cast<size_t>(p / 100.0 * (values.size() - 1) + 0.5);
+    return values[std::min(index, values.size() - 1)];
+}
+
+/** peak resident set size of the current process in MB */
+inline double peakRssMb(){
+#if defined(_WIN32)
+    PROCESS_MEMORY_COUNTERS counters;
+    if( !GetProcessMemoryInfo(GetCurrentProcess(), &counters, sizeof(counters)) )
+        return 0.0;
+    return counters.PeakWorkingSetSize / (1024.0 * 1024.0);
+#else
+    struct rusage usage;
+    if( getrusage(RUSAGE_SELF, &usage) != 0 )
+        return 0.0;
+#if defined(__APPLE__)
+    return usage.ru_maxrss / (1024.0 * 1024.0);  // bytes
+#else
+    return usage.ru_maxrss / 1024.0;  // kilobytes
+#endif
+#endif
+}
+
+/** parses a comma-separated list of positive integers, e.g. "1,2,4", skipping duplicates */
+inline std::vector<int> parseIntList( const std::string& text ){
+    std::vector<int> values;
+    std::stringstream stream(text);
+    std::string item;
+    while( std::getline(stream, item, ',') ){
+        int value = std::atoi(item.c_str());
+        if( value > 0 && std::find(values.begin(), values.end(), value) == values.end() )
+            values.push_back(value);
+    }
+    return values;
+}
+
+/** value of a "--name=value" command line argument, or the default one */
+inline std::string argValue( int argc, const char** argv, const std::string& name, const std::string& default_value ){
+    const std::string prefix = "--" + name + "=";
+    for( int i = 1; i < argc; i++ )
+        if( std::strncmp(argv[i], prefix.c_str(), prefix.size()) == 0 )
+            return argv[i] + prefix.size();
+    return default_value;
+}
+
+/** whether a "--name" flag is present on the command line */
+inline bool hasFlag( int argc, const char** argv, const std::string& name ){
+    const std::string flag = "--" + name;
+    for( int i = 1; i < argc; i++ )
+        if( flag == argv[i] )
+            return true;
+    return false;
+}
+
+} // namespace bench
+
+#endif // BENCHMARK_UTILS_HPP
@@ -0,0 +1,136 @@
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgcodecs/imgcodecs.hpp"
+#include "opencv2/imgproc/imgproc.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <iostream>
+#include <stdio.h>
+
+using namespace std;
+using namespace cv;
+
+/** One encoder configuration: file extension and imencode parameters */
+struct CodecSetting {
+    string extension;
+    string description;
+    std::vector<int> params;
+};
+
+/** Settings benchmarked for each codec, several quality/compression levels where the codec has them */
+static std::vector<CodecSetting> codecSettings( const string& codec ){
+    std::vector<CodecSetting> settings;
+    const int levels[] = {50, 75, 95};
+    if( codec == "jpg" ){
+        for( int i = 0; i < 3; i++ ){
+            CodecSetting setting = {".jpg", "quality=" + std::to_string(levels[i]), {IMWRITE_JPEG_QUALITY, levels[i]}};
+            settings.push_back(setting);
+        }
+    }
+    else if( codec == "webp" ){
+        for( int i = 0; i < 3; i++ ){
+            CodecSetting setting = {".webp", "quality=" + std::to_string(levels[i]), {IMWRITE_WEBP_QUALITY, levels[i]}};
+            settings.push_back(setting);
+        }
+        CodecSetting lossless = {".webp", "lossless", {IMWRITE_WEBP_QUALITY, 101}};
+        settings.push_back(lossless);
+    }
+    else if( codec == "png" ){
+        const int compressions[] = {1, 3, 9};
+        for( int i = 0; i < 3; i++ ){
+            CodecSetting setting = {".png", "compression=" + std::to_string(compressions[i]),
+                                    {IMWRITE_PNG_COMPRESSION, compressions[i]}};
+            settings.push_back(setting);
+        }
+    }
+    else if( codec == "exr" ){
+        CodecSetting half = {".exr", "half", {IMWRITE_EXR_TYPE, IMWRITE_EXR_TYPE_HALF}};
+        CodecSetting full = {".exr", "float", {IMWRITE_EXR_TYPE, IMWRITE_EXR_TYPE_FLOAT}};
+        settings.push_back(half);
+        settings.push_back(full);
+    }
+    else{
+        CodecSetting setting = {"." + codec, "default", std::vector<int>()};
+        settings.push_back(setting);
+    }
+    return settings;
+}
+
+/** Smooth gradients with blurred noise and a few shapes, roughly photo-like content for the encoders */
+static Mat makeImage( Size size, RNG& rng ){
+    Mat image(size, CV_8UC3);
+    for( int y = 0; y < size.height; y++ )
+        for( int x = 0; x < size.width; x++ )
+            image.at<Vec3b>(y, x) = Vec3b(saturate_cast<uchar>(x * 255 / size.width),
+                                          saturate_cast<uchar>(y * 255 / size.height),
+                                          saturate_cast<uchar>((x + y) * 127 / (size.width + size.height)));
+    Mat noise(size, CV_16SC3);
+    rng.fill(noise, RNG::NORMAL, Scalar::all(0), Scalar::all(24));
+    GaussianBlur(noise, noise, Size(5, 5), 0);
+    add(image, noise, image, noArray(), CV_8U);
+    for( int i = 0; i < 20; i++ ){
+        Point center(rng.uniform(0, size.width), rng.uniform(0, size.height));
+        Scalar color(rng.uniform(0, 256), rng.uniform(0, 256), rng.uniform(0, 256));
+        circle(image, center, rng.uniform(4, size.height / 4), color, rng.uniform(-1, 6), LINE_AA);
+    }
+    return image;
+}
+
+/** codecs [--codecs=jpg,png,tiff,webp,jp2,exr,bmp] [--iterations=N] */
+int main( int argc, const char** argv ){
+    std::vector<string> codecs;
+    std::stringstream stream(bench::argValue(argc, argv, "codecs", "jpg,png,tiff,webp,jp2,exr,bmp"));
+    for( string codec; std::getline(stream, codec, ','); )
+        if( !codec.empty() )
+            codecs.push_back(codec);
+    int iterations = std::max(1, std::atoi(bench::argValue(argc, argv, "iterations", "20").c_str()));
+
+    const Size sizes[] = {Size(320, 240), Size(1280, 720), Size(1920, 1080)};
+    RNG rng(12345);
+    std::vector<Mat> images;
+    for( int i = 0; i < 3; i++ )
+        images.push_back(makeImage(sizes[i], rng));
+
+    printf("%-6s %-14s %-10s %10s %12s %10s %12s %10s\n", "codec", "setting", "size", "bytes",
+           "enc MB/s", "enc img/s", "dec MB/s", "dec img/s");
+    for( size_t c = 0; c < codecs.size(); c++ ){
+        std::vector<CodecSetting> settings = codecSettings(codecs[c]);
+        for( size_t s = 0; s < settings.size(); s++ ){
+            for( size_t i = 0; i < images.size(); i++ ){
+                Mat image = images[i];
+                if( codecs[c] == "exr" )
+                    image.convertTo(image, CV_32F, 1.0 / 255);
+                // MB/s are computed on the raw pixel data
+                double megabytes = image.total() * image.elemSize() / (1024.0 * 1024.0);
+                std::vector<uchar> buffer;
+                try{
+                    bench::Clock::time_point start = bench::Clock::now();
+                    for( int n = 0; n < iterations; n++ )
+                        imencode(settings[s].extension, image, buffer, settings[s].params);
+                    double encode_ms = bench::elapsedMs(start);
+
+                    Mat decoded;
+                    start = bench::Clock::now();
+                    for( int n = 0; n < iterations; n++ )
+                        decoded = imdecode(buffer, IMREAD_UNCHANGED);
+                    double decode_ms = bench::elapsedMs(start);
+                    if( decoded.empty() )
+                        throw cv::Exception(Error::StsError, "decoding failed", "main", __FILE__, __LINE__);
+
+                    char size[32];
+                    snprintf(size, sizeof(size), "%dx%d", image.cols, image.rows);
+                    printf("%-6s %-14s %-10s %10d %12.2f %10.2f %12.2f %10.2f\n", codecs[c].c_str(),
+                           settings[s].description.c_str(), size, static_cast<int>(buffer.size()),
+                           megabytes * iterations * 1000.0 / encode_ms, iterations * 1000.0 / encode_ms,
+                           megabytes * iterations * 1000.0 / decode_ms, iterations * 1000.0 / decode_ms);
+                }
+                catch( const cv::Exception& e ){
+                    printf("%-6s %-14s skipped: %s\n", codecs[c].c_str(), settings[s].description.c_str(),
+                           e.what());
+                    break;
+                }
+            }
+        }
+    }
+    return 0;
+}
@@ -3,16 +3,23 @@
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
 from conans import ConanFile, CMake, tools
+from conans.errors import ConanException
+import glob
 import os
+import re
 import shutil
+import subprocess
+import time
 
 
 class TestPackageConan(ConanFile):
     settings = "os", "compiler", "build_type", "arch"
-    generators = "cmake"
+    generators = "cmake", "cmake_find_package"
 
     def build(self):
         cmake = CMake(self)
+        cmake.definitions['OPENCV_WITH_FFMPEG'] = self.options["opencv"].ffmpeg
+        cmake.definitions['OPENCV_WITH_OPENCL'] = self.options["opencv"].opencl
         cmake.configure()
         cmake.build()
 
@@ -24,4 +31,91 @@ class TestPackageConan(ConanFile):
         img_path = os.path.join(self.source_folder, "lena.jpg")
         shutil.copy(img_path, 'bin')
         with tools.chdir('bin'):
-            self.run('lena.exe' if self.settings.os == 'Windows' else './lena', run_environment=True)
+            # the test binaries are only built when the package contains their modules
+            lena, umat, codecs, video, linalg = [self._executable(name)
+                                                 for name in ['lena', 'umat', 'codecs', 'video', 'linalg']]
+            # the cascades aren't packaged with e.g. opencv:data=none
+            has_cascades = os.path.isdir('haarcascades')
+            if lena and has_cascades:
+                self.run(lena, run_environment=True)
+            elif lena:
+                self.output.warn("haarcascades are not packaged, skipping the detection pipeline")
+            else:
+                self.output.warn("objdetect or imgcodecs are not packaged, skipping the detection pipeline")
+            # the detection pipeline with OPENCV_TRACE=1
+            if self.options["opencv"].profiling and lena and has_cascades:
+                self._run_traced(lena)
+            # Mat vs UMat, runs on any OpenCL implementation, e.g. OPENCV_OPENCL_RUNTIME=/usr/lib/libpocl.so
+            if umat and has_cascades:
+                self.run(umat, run_environment=True)
+            # benchmarks are opt-in, e.g. OPENCV_TEST_BENCHMARK="--frames=64 --threads=1,8"
+            if 'OPENCV_TEST_BENCHMARK' in os.environ:
+                if lena and has_cascades:
+                    self._run_benchmark(lena, '--benchmark')
+                if codecs:
+                    self._run_benchmark(codecs, '--codecs=%s' % ','.join(self._codecs))
+                if video:
+                    self._run_benchmark(video)
+                self._run_benchmark(linalg)
+            # concurrent processes, e.g. OPENCV_TEST_PROCESSES=8
+            if 'OPENCV_TEST_PROCESSES' in os.environ and lena and has_cascades:
+                self._run_processes(lena, int(os.environ['OPENCV_TEST_PROCESSES']))
+
+    def _executable(self, name):
+        # path to run the test binary, None when it isn't built
+        executable = name + '.exe' if self.settings.os == 'Windows' else './' + name
+        return executable if os.path.isfile(executable) else None
+
+    @property
+    def _codecs(self):
+        # codecs built into OpenCV, plus the ones enabled by the opencv options
+        codecs = []
+        opencv_options = self.options["opencv"]
+        for option, codec in [("jpeg", "jpg"), ("png", "png"), ("tiff", "tiff"), ("webp", "webp"),
+                              ("jasper", "jp2"), ("openexr", "exr")]:
+            if getattr(opencv_options, option):
+                codecs.append(codec)
+        return codecs + ["bmp", "ppm"]
+
+    def _run_processes(self, lena, count):
+        # the detection pipeline in several processes at once, each with the default number of threads
+        # (opencv:threads) and thread pool behaviour (opencv:thread_pool_wait), as services sharing a host
+        command = '%s --benchmark --threads=default --workers=0 %s' % (
+            lena, os.environ.get('OPENCV_TEST_BENCHMARK', ''))
+        with tools.run_environment(self):
+            start = time.time()
+            processes = [subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
+                         for _ in range(count)]
+            outputs = [process.communicate()[0] for process in processes]
+            elapsed = time.time() - start
+        if any(process.returncode != 0 for process in processes):
+            raise ConanException("lena failed:\n%s" % '\n'.join(outputs))
+        results = [re.search(r'sequential threads=(\d+) frames=(\d+) fps=([\d.]+) peak_rss=([\d.]+) MB', output)
+                   for output in outputs]
+        results = [result for result in results if result]
+        if not results:
+            raise ConanException("no benchmark results:\n%s" % '\n'.join(outputs))
+        frames = sum(int(result.group(2)) for result in results)
+        fps = [float(result.group(3)) for result in results]
+        rss = [float(result.group(4)) for result in results]
+        self.output.info("%d processes, %s threads each (OPENCV_FOR_THREADS_NUM=%s)" %
+                         (count, results[0].group(1), os.environ.get('OPENCV_FOR_THREADS_NUM', 'unset')))
+        self.output.info("throughput: %.2f fps in total, %.2f fps per process" %
+                         (frames / elapsed, sum(fps) / len(fps)))
+        self.output.info("peak RSS: %.1f MB per process (max), %.1f MB in total" % (max(rss), sum(rss)))
+
+    def _run_traced(self, lena):
+        # OpenCV trace framework, the files can be analyzed with opencv/modules/ts/misc/trace_profiler.py
+        tools.rmdir('trace')
+        tools.mkdir('trace')
+        env = {'OPENCV_TRACE': '1', 'OPENCV_TRACE_LOCATION': os.path.join('trace', 'OpenCVTrace')}
+        with tools.environment_append(env):
+            self.run('%s --benchmark --frames=8 --threads=1 --workers=1' % lena, run_environment=True)
+        for trace_file in sorted(glob.glob(os.path.join('trace', '*.txt'))):
+            self.output.info("%s: %d records" % (trace_file, len(tools.load(trace_file).splitlines())))
+        main_trace = os.path.join('trace', 'OpenCVTrace.txt')
+        if os.path.isfile(main_trace):
+            self.output.info(tools.load(main_trace))
+
+    def _run_benchmark(self, executable, args=''):
+        self.run('%s %s %s' % (executable, args, os.environ['OPENCV_TEST_BENCHMARK']), run_environment=True)
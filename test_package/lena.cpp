@@ -1,15 +1,22 @@
+#include "opencv2/core/utility.hpp"
+#include "opencv2/core/utils/trace.hpp"
 #include "opencv2/objdetect/objdetect.hpp"
-#include "opencv2/highgui/highgui.hpp"
+#include "opencv2/imgcodecs/imgcodecs.hpp"
 #include "opencv2/imgproc/imgproc.hpp"
 
+#include "benchmark_utils.hpp"
+
+#include <atomic>
 #include <iostream>
 #include <stdio.h>
+#include <thread>
 
 using namespace std;
 using namespace cv;
 
 /** Function Headers */
 void detectAndDisplay( Mat frame );
+int runBenchmark( const Mat& image, int argc, const char** argv );
 
 /** Global variables */
 String face_cascade_name = "haarcascades/haarcascade_frontalface_alt.xml";
@@ -21,7 +28,7 @@ RNG rng(12345);
 
 /** @function main */
 int main( int argc, const char** argv ){
-    CvCapture* capture;
+    std::cout << "CPU features: " << getCPUFeaturesLine() << std::endl;
 
     //-- 1. Load the cascades
     if( !face_cascade.load( face_cascade_name ) ){ printf("--(!)Error loading face cascades\n"); return -1; };
@@ -30,8 +37,11 @@ int main( int argc, const char** argv ){
     // Read the image file
     Mat frame = imread("lena.jpg");
     // Apply the classifier to the frame
-    if (!frame.empty())
+    if (!frame.empty()){
+        if( bench::hasFlag(argc, argv, "benchmark") )
+            return runBenchmark(frame, argc, argv);
         detectAndDisplay(frame);
+    }
     else{
         printf(" --(!) No captured frame -- Break!");
     }
@@ -70,3 +80,151 @@ void detectAndDisplay( Mat frame ){
     imwrite( "out.jpg", frame );
     std::cout << "success! open \"out.jpg\" to see the resulting image." << std::endl;
 }
+
+/** Per-stage latencies of one frame, in milliseconds */
+struct StageTimes {
+    double decode, gray, equalize, faces, eyes, total;
+};
+
+/** imdecode -> cvtColor -> equalizeHist -> detectMultiScale (faces, then eyes in each face) */
+static StageTimes processFrame( const std::vector<uchar>& jpeg, CascadeClassifier& faces_classifier,
+                                CascadeClassifier& eyes_classifier ){
+    // named regions of the OpenCV trace framework, no-ops unless OpenCV is built with CV_TRACE
+    CV_TRACE_FUNCTION();
+    StageTimes times;
+    bench::Clock::time_point start = bench::Clock::now();
+    bench::Clock::time_point stage = start;
+
+    CV_TRACE_REGION("decode");
+    Mat frame = imdecode(jpeg, IMREAD_COLOR);
+    times.decode = bench::elapsedMs(stage);
+
+    CV_TRACE_REGION_NEXT("cvtColor");
+    stage = bench::Clock::now();
+    Mat frame_gray;
+    cvtColor(frame, frame_gray, COLOR_BGR2GRAY);
+    times.gray = bench::elapsedMs(stage);
+
+    CV_TRACE_REGION_NEXT("equalize");
+    stage = bench::Clock::now();
+    equalizeHist(frame_gray, frame_gray);
+    times.equalize = bench::elapsedMs(stage);
+
+    CV_TRACE_REGION_NEXT("faces");
+    stage = bench::Clock::now();
+    std::vector<Rect> faces;
+    faces_classifier.detectMultiScale(frame_gray, faces, 1.1, 2, 0 | CASCADE_SCALE_IMAGE, Size(30, 30));
+    times.faces = bench::elapsedMs(stage);
+
+    CV_TRACE_REGION_NEXT("eyes");
+    stage = bench::Clock::now();
+    for( size_t i = 0; i < faces.size(); i++ ){
+        std::vector<Rect> eyes;
+        eyes_classifier.detectMultiScale(frame_gray(faces[i]), eyes, 1.1, 2, 0 | CASCADE_SCALE_IMAGE, Size(30, 30));
+    }
+    times.eyes = bench::elapsedMs(stage);
+
+    times.total = bench::elapsedMs(start);
+    return times;
+}
+
+/** JPEG-encoded frames made of the tiled image, shifted, mirrored and with varying brightness */
+static std::vector<std::vector<uchar> > makeFrames( const Mat& image, int count ){
+    Mat tiled;
+    repeat(image, 3, 3, tiled);
+    std::vector<std::vector<uchar> > frames(count);
+    for( int i = 0; i < count; i++ ){
+        int dx = (i * 37) % image.cols;
+        int dy = (i * 53) % image.rows;
+        Mat frame = tiled(Rect(dx, dy, image.cols * 2, image.rows * 2)).clone();
+        if( i % 2 )
+            flip(frame, frame, 1);
+        frame.convertTo(frame, -1, 1.0, (i % 5) * 8.0 - 16.0);
+        imencode(".jpg", frame, frames[i]);
+    }
+    return frames;
+}
+
+static void printStage( const char* name, const std::vector<double>& values ){
+    printf("    %-9s p50 %8.2f ms  p90 %8.2f ms  p99 %8.2f ms\n", name,
+           bench::percentile(values, 50), bench::percentile(values, 90), bench::percentile(values, 99));
+}
+
+/** Processes all frames in sequence, OpenCV parallelizes inside the calls. threads=0 keeps the default,
+    e.g. OPENCV_FOR_THREADS_NUM */
+static void runSequential( const std::vector<std::vector<uchar> >& frames, int threads ){
+    if( threads > 0 )
+        setNumThreads(threads);
+    std::vector<double> decode, gray, equalize, faces, eyes, total;
+    bench::Clock::time_point start = bench::Clock::now();
+    for( size_t i = 0; i < frames.size(); i++ ){
+        StageTimes times = processFrame(frames[i], face_cascade, eyes_cascade);
+        decode.push_back(times.decode);
+        gray.push_back(times.gray);
+        equalize.push_back(times.equalize);
+        faces.push_back(times.faces);
+        eyes.push_back(times.eyes);
+        total.push_back(times.total);
+    }
+    double elapsed = bench::elapsedMs(start);
+    printf("sequential threads=%d frames=%d fps=%.2f peak_rss=%.1f MB\n", getNumThreads(),
+           static_cast<int>(frames.size()), frames.size() * 1000.0 / elapsed, bench::peakRssMb());
+    printStage("decode", decode);
+    printStage("cvtColor", gray);
+    printStage("equalize", equalize);
+    printStage("faces", faces);
+    printStage("eyes", eyes);
+    printStage("total", total);
+}
+
+/** Processes frames concurrently, one worker thread per classifier pair, OpenCV itself single-threaded */
+static bool runBatch( const std::vector<std::vector<uchar> >& frames, int workers ){
+    setNumThreads(1);
+    std::vector<CascadeClassifier> faces_classifiers(workers), eyes_classifiers(workers);
+    for( int w = 0; w < workers; w++ )
+        if( !faces_classifiers[w].load(face_cascade_name) || !eyes_classifiers[w].load(eyes_cascade_name) )
+            return false;
+
+    std::atomic<size_t> next(0);
+    std::vector<std::vector<double> > totals(workers);
+    std::vector<std::thread> threads;
+    bench::Clock::time_point start = bench::Clock::now();
+    for( int w = 0; w < workers; w++ ){
+        threads.push_back(std::thread([&, w](){
+            for( size_t i = next++; i < frames.size(); i = next++ )
+                totals[w].push_back(processFrame(frames[i], faces_classifiers[w], eyes_classifiers[w]).total);
+        }));
+    }
+    for( size_t t = 0; t < threads.size(); t++ )
+        threads[t].join();
+    double elapsed = bench::elapsedMs(start);
+
+    std::vector<double> total;
+    for( int w = 0; w < workers; w++ )
+        total.insert(total.end(), totals[w].begin(), totals[w].end());
+    printf("batch workers=%d frames=%d fps=%.2f peak_rss=%.1f MB\n", workers,
+           static_cast<int>(frames.size()), frames.size() * 1000.0 / elapsed, bench::peakRssMb());
+    printStage("total", total);
+    return true;
+}
+
+/** lena --benchmark [--frames=N] [--threads=1,2,4|default] [--workers=1,2,4] */
+int runBenchmark( const Mat& image, int argc, const char** argv ){
+    std::ostringstream cpus;
+    cpus << "1,2,4," << getNumberOfCPUs();
+    int count = std::atoi(bench::argValue(argc, argv, "frames", "32").c_str());
+    string threads_arg = bench::argValue(argc, argv, "threads", cpus.str());
+    std::vector<int> threads = threads_arg == "default" ? std::vector<int>(1, 0) : bench::parseIntList(threads_arg);
+    std::vector<int> workers = bench::parseIntList(bench::argValue(argc, argv, "workers", cpus.str()));
+
+    std::vector<std::vector<uchar> > frames = makeFrames(image, count);
+    printf("benchmark: %d frames of %dx%d, %d CPUs\n", count, image.cols * 2, image.rows * 2, getNumberOfCPUs());
+    for( size_t i = 0; i < threads.size(); i++ )
+        runSequential(frames, threads[i]);
+    for( size_t i = 0; i < workers.size(); i++ )
+        if( !runBatch(frames, workers[i]) ){
+            printf("--(!)Error loading cascades\n");
+            return -1;
+        }
+    return 0;
+}
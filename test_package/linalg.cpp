@@ -0,0 +1,130 @@
+#include "opencv2/core/utility.hpp"
+#include "opencv2/core.hpp"
+#ifdef WITH_DNN_BENCHMARK
+#include "opencv2/dnn.hpp"
+#endif
+
+#include "benchmark_utils.hpp"
+
+#include <iostream>
+#include <stdio.h>
+
+using namespace std;
+using namespace cv;
+
+/** runs the function the given number of times, returns the median time in milliseconds */
+template <typename Function>
+static double measure( int iterations, Function function ){
+    std::vector<double> times;
+    for( int i = 0; i < iterations; i++ ){
+        bench::Clock::time_point start = bench::Clock::now();
+        function();
+        times.push_back(bench::elapsedMs(start));
+    }
+    return bench::percentile(times, 50);
+}
+
+/** the LAPACK line of the build information, tells which implementation OpenCV uses */
+static string lapackInfo(){
+    std::stringstream stream(getBuildInformation());
+    for( string line; std::getline(stream, line); )
+        if( line.find("Lapack:") != string::npos )
+            return line.substr(line.find_first_not_of(' '));
+    return "Lapack: NO";
+}
+
+#ifdef WITH_DNN_BENCHMARK
+static void addLayer( dnn::Net& net, const string& name, const string& type, dnn::LayerParams params ){
+    params.name = name;
+    params.type = type;
+    net.addLayerToPrev(name, type, params);
+}
+
+static dnn::LayerParams convolution( int inputs, int outputs, RNG& rng ){
+    dnn::LayerParams params;
+    params.set("kernel_size", 3);
+    params.set("pad", 1);
+    params.set("stride", 1);
+    params.set("num_output", outputs);
+    params.set("bias_term", true);
+    int weights_shape[] = {outputs, inputs, 3, 3};
+    Mat weights(4, weights_shape, CV_32F), bias(1, outputs, CV_32F);
+    rng.fill(weights, RNG::UNIFORM, -0.1, 0.1);
+    rng.fill(bias, RNG::UNIFORM, -0.1, 0.1);
+    params.blobs.push_back(weights);
+    params.blobs.push_back(bias);
+    return params;
+}
+
+static dnn::LayerParams maxPooling(){
+    dnn::LayerParams params;
+    params.set("pool", String("max"));
+    params.set("kernel_size", 2);
+    params.set("stride", 2);
+    return params;
+}
+
+/** conv-relu-pool x2 followed by a fully connected layer, on a 3x112x112 input */
+static dnn::Net smallCnn( RNG& rng ){
+    dnn::Net net;
+    addLayer(net, "conv1", "Convolution", convolution(3, 32, rng));
+    addLayer(net, "relu1", "ReLU", dnn::LayerParams());
+    addLayer(net, "pool1", "Pooling", maxPooling());
+    addLayer(net, "conv2", "Convolution", convolution(32, 64, rng));
+    addLayer(net, "relu2", "ReLU", dnn::LayerParams());
+    addLayer(net, "pool2", "Pooling", maxPooling());
+
+    dnn::LayerParams fc;
+    fc.set("num_output", 10);
+    fc.set("bias_term", true);
+    Mat weights(10, 64 * 28 * 28, CV_32F), bias(1, 10, CV_32F);
+    rng.fill(weights, RNG::UNIFORM, -0.01, 0.01);
+    rng.fill(bias, RNG::UNIFORM, -0.1, 0.1);
+    fc.blobs.push_back(weights);
+    fc.blobs.push_back(bias);
+    addLayer(net, "fc", "InnerProduct", fc);
+    net.setPreferableBackend(dnn::DNN_BACKEND_OPENCV);
+    net.setPreferableTarget(dnn::DNN_TARGET_CPU);
+    return net;
+}
+#endif
+
+/** linalg [--iterations=N]: gemm, solve, SVD and a small CNN forward pass */
+int main( int argc, const char** argv ){
+    int iterations = std::max(1, std::atoi(bench::argValue(argc, argv, "iterations", "10").c_str()));
+    RNG rng(12345);
+    printf("%s, %d threads\n", lapackInfo().c_str(), getNumThreads());
+
+    const int sizes[] = {128, 256, 512, 1024};
+    for( int i = 0; i < 4; i++ ){
+        int n = sizes[i];
+        Mat a(n, n, CV_32F), b(n, n, CV_32F), c;
+        rng.fill(a, RNG::UNIFORM, -1, 1);
+        rng.fill(b, RNG::UNIFORM, -1, 1);
+        double ms = measure(iterations, [&](){ gemm(a, b, 1.0, noArray(), 0.0, c); });
+        printf("gemm   %5dx%-5d %10.3f ms %8.2f GFLOPS\n", n, n, ms, 2.0 * n * n * n / (ms * 1e6));
+    }
+    for( int i = 0; i < 3; i++ ){
+        int n = sizes[i];
+        // diagonally dominant, so the system is well conditioned
+        Mat a(n, n, CV_64F), b(n, 1, CV_64F), x;
+        rng.fill(a, RNG::UNIFORM, -1, 1);
+        rng.fill(b, RNG::UNIFORM, -1, 1);
+        a += Mat::eye(n, n, CV_64F) * n;
+        double lu_ms = measure(iterations, [&](){ solve(a, b, x, DECOMP_LU); });
+        double svd_ms = measure(iterations, [&](){ SVD svd(a); });
+        printf("solve  %5dx%-5d %10.3f ms\n", n, n, lu_ms);
+        printf("svd    %5dx%-5d %10.3f ms\n", n, n, svd_ms);
+    }
+#ifdef WITH_DNN_BENCHMARK
+    dnn::Net net = smallCnn(rng);
+    int input_shape[] = {1, 3, 112, 112};
+    Mat input(4, input_shape, CV_32F);
+    rng.fill(input, RNG::UNIFORM, 0, 1);
+    net.setInput(input);
+    net.forward();  // warm-up, allocates the layers
+    double ms = measure(iterations, [&](){ net.setInput(input); net.forward(); });
+    printf("dnn    small CNN   %10.3f ms\n", ms);
+#endif
+    return 0;
+}
@@ -0,0 +1,66 @@
+#include "opencv2/core/ocl.hpp"
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgcodecs/imgcodecs.hpp"
+#include "opencv2/imgproc/imgproc.hpp"
+#include "opencv2/objdetect/objdetect.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <iostream>
+#include <stdio.h>
+
+using namespace std;
+using namespace cv;
+
+/** cvtColor -> equalizeHist -> detectMultiScale on Mat or UMat, returns the number of faces */
+template <typename MatType>
+static size_t detect( const MatType& frame, CascadeClassifier& classifier, std::vector<double>& times ){
+    bench::Clock::time_point start = bench::Clock::now();
+    MatType frame_gray;
+    cvtColor(frame, frame_gray, COLOR_BGR2GRAY);
+    equalizeHist(frame_gray, frame_gray);
+    std::vector<Rect> faces;
+    classifier.detectMultiScale(frame_gray, faces, 1.1, 2, 0 | CASCADE_SCALE_IMAGE, Size(30, 30));
+    times.push_back(bench::elapsedMs(start));
+    return faces.size();
+}
+
+/** umat [--iterations=N]: the lena pipeline with cv::Mat and with cv::UMat (T-API / OpenCL) */
+int main( int argc, const char** argv ){
+    int iterations = std::max(1, std::atoi(bench::argValue(argc, argv, "iterations", "5").c_str()));
+
+    if( !ocl::haveOpenCL() ){
+        printf("OpenCL is not available, set OPENCV_OPENCL_RUNTIME to use e.g. POCL\n");
+        return 0;
+    }
+    ocl::setUseOpenCL(true);
+    const ocl::Device& device = ocl::Device::getDefault();
+    printf("OpenCL device: %s (%s), %s\n", device.name().c_str(), device.vendorName().c_str(),
+           device.version().c_str());
+
+    CascadeClassifier classifier;
+    if( !classifier.load("haarcascades/haarcascade_frontalface_alt.xml") ){
+        printf("--(!)Error loading face cascades\n");
+        return -1;
+    }
+    Mat image = imread("lena.jpg");
+    if( image.empty() ){
+        printf(" --(!) No captured frame -- Break!\n");
+        return -1;
+    }
+    UMat uimage = image.getUMat(ACCESS_READ);
+
+    std::vector<double> mat_times, umat_times;
+    size_t mat_faces = 0, umat_faces = 0;
+    for( int i = 0; i < iterations; i++ ){
+        mat_faces = detect(image, classifier, mat_times);
+        umat_faces = detect(uimage, classifier, umat_times);
+    }
+    // the first UMat iteration includes the OpenCL kernels compilation
+    printf("Mat  faces=%d p50 %8.2f ms\n", static_cast<int>(mat_faces), bench::percentile(mat_times, 50));
+    printf("UMat faces=%d p50 %8.2f ms first %8.2f ms\n", static_cast<int>(umat_faces),
+           bench::percentile(umat_times, 50), umat_times.front());
+    if( mat_faces != umat_faces )
+        printf("warning: Mat and UMat pipelines found a different number of faces\n");
+    return 0;
+}
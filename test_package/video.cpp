@@ -0,0 +1,96 @@
+#include "opencv2/core/utility.hpp"
+#include "opencv2/imgproc/imgproc.hpp"
+#include "opencv2/videoio/videoio.hpp"
+
+#include "benchmark_utils.hpp"
+
+#include <cstdio>
+#include <iostream>
+#include <stdio.h>
+
+using namespace std;
+using namespace cv;
+
+/** Container and FOURCC of a clip to generate */
+struct VideoFormat {
+    const char* name;
+    const char* extension;
+    int fourcc;
+};
+
+/** Moving gradient with a few moving shapes, so the encoders have motion to compress */
+static Mat makeFrame( Size size, int index ){
+    Mat frame(size, CV_8UC3);
+    for( int y = 0; y < size.height; y++ )
+        for( int x = 0; x < size.width; x++ )
+            frame.at<Vec3b>(y, x) = Vec3b(saturate_cast<uchar>((x + index * 4) % 256),
+                                          saturate_cast<uchar>((y + index * 2) % 256),
+                                          saturate_cast<uchar>((x + y) / 8 % 256));
+    for( int i = 0; i < 8; i++ ){
+        Point center((i * size.width / 8 + index * (i + 1) * 3) % size.width, (i * 97 + index * 5) % size.height);
+        circle(frame, center, size.height / 12, Scalar(i * 30, 255 - i * 30, 128), -1, LINE_AA);
+    }
+    return frame;
+}
+
+/** video [--frames=N] [--width=W] [--height=H] */
+int main( int argc, const char** argv ){
+    int count = std::max(1, std::atoi(bench::argValue(argc, argv, "frames", "300").c_str()));
+    Size size(std::atoi(bench::argValue(argc, argv, "width", "1280").c_str()),
+              std::atoi(bench::argValue(argc, argv, "height", "720").c_str()));
+
+    const VideoFormat formats[] = {
+        {"h264", ".mp4", VideoWriter::fourcc('a', 'v', 'c', '1')},
+        {"mpeg4", ".avi", VideoWriter::fourcc('X', 'V', 'I', 'D')},
+        {"mjpeg", ".avi", VideoWriter::fourcc('M', 'J', 'P', 'G')}};
+
+    std::vector<Mat> frames;
+    for( int i = 0; i < 30; i++ )
+        frames.push_back(makeFrame(size, i));
+
+    printf("%-6s %-10s %8s %12s %12s\n", "codec", "size", "frames", "read fps", "grab fps");
+    for( size_t f = 0; f < sizeof(formats) / sizeof(formats[0]); f++ ){
+        // the clip is generated locally, with the codecs the FFmpeg package can encode
+        string filename = string("benchmark_") + formats[f].name + formats[f].extension;
+        {
+            VideoWriter writer(filename, CAP_FFMPEG, formats[f].fourcc, 30, size);
+            if( !writer.isOpened() ){
+                printf("%-6s skipped: no encoder\n", formats[f].name);
+                continue;
+            }
+            for( int i = 0; i < count; i++ )
+                writer.write(frames[i % frames.size()]);
+        }
+
+        // full decode + conversion to BGR
+        VideoCapture capture(filename, CAP_FFMPEG);
+        if( !capture.isOpened() ){
+            printf("%-6s skipped: cannot open %s\n", formats[f].name, filename.c_str());
+            continue;
+        }
+        Mat frame;
+        int decoded = 0;
+        bench::Clock::time_point start = bench::Clock::now();
+        while( capture.read(frame) )
+            decoded++;
+        double read_ms = bench::elapsedMs(start);
+        capture.release();
+
+        // decode only
+        capture.open(filename, CAP_FFMPEG);
+        int grabbed = 0;
+        start = bench::Clock::now();
+        while( capture.grab() )
+            grabbed++;
+        double grab_ms = bench::elapsedMs(start);
+        capture.release();
+
+        char dimensions[32];
+        snprintf(dimensions, sizeof(dimensions), "%dx%d", size.width, size.height);
+        printf("%-6s %-10s %8d %12.1f %12.1f\n", formats[f].name, dimensions, decoded,
+               decoded * 1000.0 / read_ms, grabbed * 1000.0 / grab_ms);
+        std::remove(filename.c_str());
+    }
+    printf("peak_rss=%.1f MB\n", bench::peakRssMb());
+    return 0;
+}